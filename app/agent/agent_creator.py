@@ -1,5 +1,11 @@
-from fastapi import FastAPI
-from app.agent.error_extractor.agent import BaseAgent
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from app.agent.base_agent import BaseAgent
 from app.schema.agent_message import AgentMessage
 
 
@@ -8,17 +14,57 @@ def create_agent(agent: BaseAgent, agent_card: dict):
     agent_ = agent_card["agent"]
     agent_skills = agent_card["skills"]
 
+    # The card never changes while the server runs so its body and etag are built once
+    card_body = json.dumps({"agent": agent_, "skills": agent_skills})
+    card_etag = f'"{hashlib.sha256(card_body.encode()).hexdigest()[:32]}"'
+    card_headers = {
+        "ETag": card_etag,
+        "Cache-Control": f"public, max-age={int(os.environ.get('AGENT_CARD_MAX_AGE', 300))}",
+    }
+
+    # Open and close the agent resources with the server
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await agent.start()
+        try:
+            yield
+        finally:
+            await agent.close()
+
     # Initalize the fastapi app
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     # Run the agent executor
     @app.post("/run", tags=[agent_["name"]])
     async def run(message: AgentMessage):
         return await agent.execute(message=message)
 
+    # Run the agent executor and stream every event as server sent events
+    @app.post("/run/stream", tags=[agent_["name"]])
+    async def run_stream(message: AgentMessage):
+        async def event_stream():
+            try:
+                async for event in agent.stream(message=message):
+                    yield f"data: {json.dumps(jsonable_encoder(event))}\n\n"
+            except Exception as e:
+                error = {"type": "error", "data": str(e)}
+                yield f"data: {json.dumps(error)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
     # Get the agent card
     @app.get("/.well-known/agent.json", tags=[agent_["name"]])
-    async def agent_card():
-        return {"agent": agent_, "skills": agent_skills}
+    async def agent_card(request: Request):
+        if request.headers.get("If-None-Match") == card_etag:
+            return Response(status_code=304, headers=card_headers)
+        return Response(
+            content=card_body, media_type="application/json", headers=card_headers
+        )
+
+    # Agent stats for monitoring
+    @app.get("/stats", tags=[agent_["name"]])
+    async def stats():
+        return agent.stats()
 
     return app
@@ -1,22 +1,185 @@
-from abc import ABC, abstractmethod
-from google.adk.sessions import InMemorySessionService
+import time
+from abc import ABC
+from collections import OrderedDict
+from google.adk.sessions import BaseSessionService
+from google.adk.agents.invocation_context import new_invocation_context_id
 from google.adk.agents.llm_agent import LlmAgent
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.genai import types
+from app.agent.history_compactor import HistoryCompactor
+from app.agent.session_service import ManagedSessionService
 from app.schema.agent_message import AgentMessage
 
+# Number of sessions remembered as existing so their lookup can be skipped
+KNOWN_SESSIONS_LIMIT = 10000
+# Known sessions are looked up again after this long since they may have been evicted
+KNOWN_SESSIONS_TTL = 300
+
 
 # BaseAgent Class to create all agents
 class BaseAgent(ABC):
     def __init__(
-        self, app_name: str, session_service: InMemorySessionService, agent: LlmAgent
+        self, app_name: str, session_service: BaseSessionService, agent: LlmAgent
     ):
         self.app_name = app_name
         self.session_service = session_service
         self.agent = agent
+        # Bound the history replayed to the model on every turn
+        self.compactor = HistoryCompactor.from_env()
+        self.compactor.install(self.agent)
+        # The runner holds no per session state so one is shared by every request
+        self.runner = Runner(
+            agent=self.agent,
+            app_name=self.app_name,
+            session_service=self.session_service,
+        )
+        self._known_sessions = OrderedDict()
+        # Sessions evicted by the session service have to be looked up and created again
+        if isinstance(self.session_service, ManagedSessionService):
+            self.session_service.add_delete_listener(self._forget_session)
 
-    @abstractmethod
-    async def get_current_session(self, user_id: str, session_id: str):
+    def _forget_session(self, app_name: str, user_id: str, session_id: str):
+        if app_name == self.app_name:
+            self._known_sessions.pop((user_id, session_id), None)
+
+    # Resources opened and closed with the agent server
+    async def start(self):
         pass
 
-    @abstractmethod
-    async def execute(self, message: AgentMessage):
+    async def close(self):
         pass
+
+    # Build the user message, the blob id rides along in the text so the llm can pass it on
+    def build_content(self, message: AgentMessage):
+        query = message.query
+        if message.blob_id:
+            query = f"{query}\nImage Blob Id: {message.blob_id}"
+        return types.Content(role="user", parts=[types.Part(text=query)])
+
+    # Get or create the current session and return the shared runner
+    async def get_current_session(self, user_id: str, session_id: str):
+        key = (user_id, session_id)
+        last_seen = self._known_sessions.get(key)
+        if last_seen is not None and time.time() - last_seen < KNOWN_SESSIONS_TTL:
+            self._known_sessions[key] = time.time()
+            self._known_sessions.move_to_end(key)
+            return self.runner
+
+        current_session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=user_id, session_id=session_id
+        )
+        if not current_session:
+            await self.session_service.create_session(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            )
+        self._known_sessions[key] = time.time()
+        self._known_sessions.move_to_end(key)
+        if len(self._known_sessions) > KNOWN_SESSIONS_LIMIT:
+            self._known_sessions.popitem(last=False)
+        return self.runner
+
+    # Stream the agent events as they arrive
+    async def stream(self, message: AgentMessage):
+        runner = await self.get_current_session(
+            session_id=message.session_id, user_id=message.user_id
+        )
+        content = self.build_content(message)
+
+        try:
+            for attempt in range(2):
+                events = runner.run_async(
+                    user_id=message.user_id,
+                    session_id=message.session_id,
+                    new_message=content,
+                )
+                started = False
+                try:
+                    async for event in events:
+                        started = True
+                        if event.get_function_calls():
+                            yield {
+                                "type": "function_calls",
+                                "data": event.get_function_calls(),
+                            }
+                        elif event.get_function_responses():
+                            yield {
+                                "type": "function_responses",
+                                "data": event.get_function_responses(),
+                            }
+                        elif event.is_final_response():
+                            yield {
+                                "type": "final_response",
+                                "data": event.content.parts[0].text,
+                            }
+                    break
+                except ValueError as e:
+                    # The session was deleted behind our back, by another replica for
+                    # example, it is created again once before the turn starts
+                    if started or attempt or not str(e).startswith("Session not found"):
+                        raise
+                    self._forget_session(
+                        self.app_name, message.user_id, message.session_id
+                    )
+                    runner = await self.get_current_session(
+                        session_id=message.session_id, user_id=message.user_id
+                    )
+        finally:
+            # Write the events buffered during the turn once it is over
+            if isinstance(self.session_service, ManagedSessionService):
+                await self.session_service.flush_session(
+                    self.app_name, message.user_id, message.session_id
+                )
+
+    # Record a turn answered without the runner, so the later llm turns of the session see it
+    async def append_turn(self, message: AgentMessage, response: str = None):
+        await self.get_current_session(
+            session_id=message.session_id, user_id=message.user_id
+        )
+        session = await self.session_service.get_session(
+            app_name=self.app_name,
+            user_id=message.user_id,
+            session_id=message.session_id,
+        )
+        invocation_id = new_invocation_context_id()
+        await self.session_service.append_event(
+            session,
+            Event(
+                invocation_id=invocation_id,
+                author="user",
+                content=self.build_content(message),
+            ),
+        )
+        if response:
+            await self.session_service.append_event(
+                session,
+                Event(
+                    invocation_id=invocation_id,
+                    author=self.agent.name,
+                    content=types.Content(
+                        role="model", parts=[types.Part(text=response)]
+                    ),
+                ),
+            )
+        if isinstance(self.session_service, ManagedSessionService):
+            await self.session_service.flush_session(
+                self.app_name, message.user_id, message.session_id
+            )
+
+    # Agent Interaction
+    async def execute(self, message: AgentMessage):
+        agent_response = {}
+        async for event in self.stream(message=message):
+            agent_response[event["type"]] = event["data"]
+
+        return agent_response
+
+    # Agent stats for monitoring
+    def stats(self) -> dict:
+        stats = {
+            "known_sessions": len(self._known_sessions),
+            "history_compactor": self.compactor.stats(),
+        }
+        if isinstance(self.session_service, ManagedSessionService):
+            stats["session_service"] = self.session_service.stats()
+        return stats
@@ -1,9 +1,6 @@
 from google.adk.tools.mcp_tool.mcp_toolset import McpToolset, SseConnectionParams
 from google.adk.agents.llm_agent import LlmAgent
-from google.genai import types
-from google.adk.runners import Runner
 from dotenv import load_dotenv
-from app.schema.agent_message import AgentMessage
 from app.agent.base_agent import BaseAgent
 from opik.integrations.adk import OpikTracer
 import os
@@ -13,7 +10,7 @@ load_dotenv()
 # Initalizing all the agent tools here
 toolset = McpToolset(
     connection_params=SseConnectionParams(url=os.environ.get("MCP_SERVER_URL")),
-    tool_filter=["error_tracer"],
+    tool_filter=["error_tracer", "error_text_tracer"],
 )
 
 # Initalizing the agent Observability
@@ -36,43 +33,6 @@ class ErrorExtractorAgent(BaseAgent):
     def __init__(self, app_name, session_service, agent):
         super().__init__(app_name, session_service, agent)
 
-    # Get the current session
-    async def get_current_session(self, user_id: str, session_id: str):
-        current_session = await self.session_service.get_session(
-            app_name=self.app_name, user_id=user_id, session_id=session_id
-        )
-        if not current_session:
-            current_session = await self.session_service.create_session(
-                app_name=self.app_name, user_id=user_id, session_id=session_id
-            )
-        runner = Runner(
-            agent=self.agent,
-            app_name=self.app_name,
-            session_service=self.session_service,
-        )
-        return runner
-
-    # Agent Interaction
-    async def execute(self, message: AgentMessage):
-        runner = await self.get_current_session(
-            session_id=message.session_id, user_id=message.user_id
-        )
-        content = types.Content(role="user", parts=[types.Part(text=message.query)])
-        events = runner.run_async(
-            user_id=message.user_id, session_id=message.session_id, new_message=content
-        )
-
-        agent_response = {}
-        async for event in events:
-            if event.get_function_calls():
-                agent_response["function_calls"] = event.get_function_calls()
-            elif event.get_function_responses():
-                agent_response["function_responses"] = event.get_function_responses()
-            elif event.is_final_response():
-                agent_response["final_response"] = event.content.parts[0].text
-
-        return agent_response
-
 
 # Initalizing the error extractor agent
 error_extractor_agent = LlmAgent(
@@ -81,6 +41,8 @@ error_extractor_agent = LlmAgent(
     instruction="""
     Your a CodingBuddyErrorExtractor who is specialized in tracing the error how its caused.
     your task is to process the image and extract all the sufficient information about the caused error.
+    when the query has an image blob id pass it as blob_id to the error_tracer tool, otherwise pass the image path.
+    when the query contains the error output or traceback as text pass that text to the error_text_tracer tool instead.
     return all the extracted information from the image.
     """,
     tools=[toolset],
@@ -1,6 +1,6 @@
 import uvicorn
 from app.agent.agent_creator import create_agent
-from google.adk.sessions import InMemorySessionService
+from app.agent.session_service import create_session_service
 from app.agent.error_extractor.agent import ErrorExtractorAgent, error_extractor_agent
 import os
 
@@ -8,18 +8,18 @@ import os
 error_executor_agent_card = {
     "agent": {
         "name": "Image Error Extractor",
-        "description": "Extracts all the key information from the image path given which caused the error and return a detailed analysis",
+        "description": "Extracts all the key information from the image path, image blob id or pasted error text given which caused the error and return a detailed analysis",
         "version": "1.0.0",
         "url": "http://localhost:8000",
     },
     "skills": {
         "name": "Extracting Error",
-        "description": "Generates a detailed report from the image of what caused the error",
-        "tags": ["error", "issue"],
+        "description": "Generates a detailed report from the image or the traceback text of what caused the error",
+        "tags": ["error", "issue", "traceback", "image", "screenshot"],
     },
 }
 # Initalizing the agent session service
-session_service = InMemorySessionService()
+session_service = create_session_service()
 agent_runner = ErrorExtractorAgent(
     app_name=os.environ.get("APP_NAME"),
     session_service=session_service,
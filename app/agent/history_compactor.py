@@ -0,0 +1,157 @@
+import json
+import os
+from google.genai import types
+
+# Rough number of characters per token used to estimate the prompt size
+CHARS_PER_TOKEN = 4
+
+
+def _part_chars(part: types.Part):
+    if part.text:
+        return len(part.text)
+    if part.function_call:
+        return len(json.dumps(part.function_call.args or {}, default=str))
+    if part.function_response:
+        return len(json.dumps(part.function_response.response or {}, default=str))
+    return 0
+
+
+def estimate_tokens(contents: list[types.Content]):
+    chars = sum(
+        _part_chars(part) for content in contents for part in content.parts or []
+    )
+    return chars // CHARS_PER_TOKEN
+
+
+# Keeps the history sent to the model under a token budget, the session itself is untouched
+class HistoryCompactor:
+    def __init__(
+        self,
+        token_budget: int = 8000,
+        keep_recent: int = 6,
+        max_response_chars: int = 1500,
+    ):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.max_response_chars = max_response_chars
+        self._counters = {
+            "turns": 0,
+            "compacted_turns": 0,
+            "tokens_before": 0,
+            "tokens_after": 0,
+            "tokens_saved": 0,
+        }
+        self.last = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            token_budget=int(os.environ.get("HISTORY_TOKEN_BUDGET", 8000)),
+            keep_recent=int(os.environ.get("HISTORY_KEEP_RECENT", 6)),
+            max_response_chars=int(os.environ.get("HISTORY_MAX_RESPONSE_CHARS", 1500)),
+        )
+
+    # Run the compaction before the already configured model callbacks
+    def install(self, agent):
+        callbacks = agent.before_model_callback
+        if callbacks is None:
+            callbacks = []
+        elif not isinstance(callbacks, list):
+            callbacks = [callbacks]
+        agent.before_model_callback = [self.before_model_callback, *callbacks]
+
+    def _truncate_part(self, part: types.Part):
+        limit = self.max_response_chars
+        if part.function_response:
+            response = json.dumps(part.function_response.response or {}, default=str)
+            if len(response) <= limit:
+                return part
+            return types.Part(
+                function_response=types.FunctionResponse(
+                    id=part.function_response.id,
+                    name=part.function_response.name,
+                    response={"truncated_result": response[:limit] + "... [truncated]"},
+                )
+            )
+        if part.text and len(part.text) > limit:
+            return types.Part(text=part.text[:limit] + "... [truncated]")
+        return part
+
+    # Shrink the large payloads of the older turns
+    def _truncate_old(self, contents: list[types.Content]):
+        cutoff = max(len(contents) - self.keep_recent, 0)
+        compacted = []
+        for i, content in enumerate(contents):
+            if i >= cutoff:
+                compacted.append(content)
+                continue
+            compacted.append(
+                types.Content(
+                    role=content.role,
+                    parts=[self._truncate_part(part) for part in content.parts or []],
+                )
+            )
+        return compacted
+
+    # Drop the oldest turns, a turn always starts at a plain user message so
+    # function calls and their responses are never split
+    def _drop_oldest(self, contents: list[types.Content]):
+        dropped = 0
+        while (
+            estimate_tokens(contents) > self.token_budget
+            and len(contents) > self.keep_recent
+        ):
+            next_start = None
+            for i in range(1, len(contents) - self.keep_recent + 1):
+                content = contents[i]
+                if content.role == "user" and not any(
+                    part.function_response for part in content.parts or []
+                ):
+                    next_start = i
+                    break
+            if next_start is None:
+                break
+            dropped += next_start
+            contents = contents[next_start:]
+        if dropped:
+            # The kept history starts at a user message so the note goes in front of it
+            note = types.Part(
+                text=f"[{dropped} earlier messages were omitted to keep the conversation short]"
+            )
+            first = contents[0]
+            contents = [
+                types.Content(role=first.role, parts=[note, *(first.parts or [])]),
+                *contents[1:],
+            ]
+        return contents
+
+    def before_model_callback(self, callback_context, llm_request):
+        contents = llm_request.contents or []
+        tokens_before = estimate_tokens(contents)
+        tokens_after = tokens_before
+        if tokens_before > self.token_budget:
+            contents = self._truncate_old(contents)
+            if estimate_tokens(contents) > self.token_budget:
+                contents = self._drop_oldest(contents)
+            llm_request.contents = contents
+            tokens_after = estimate_tokens(contents)
+            self._counters["compacted_turns"] += 1
+
+        self._counters["turns"] += 1
+        self._counters["tokens_before"] += tokens_before
+        self._counters["tokens_after"] += tokens_after
+        self._counters["tokens_saved"] += tokens_before - tokens_after
+        self.last = {
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after,
+        }
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "token_budget": self.token_budget,
+            "keep_recent": self.keep_recent,
+            **self._counters,
+            "last": self.last,
+        }
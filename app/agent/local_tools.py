@@ -0,0 +1,40 @@
+from google.adk.tools import ToolContext
+from app.agent.progress_relay import progress_relay
+from app.tools.tool_server import agent_registry, run_agent
+
+
+# The orchestrator tools as plain functions for a single node deployment, the orchestrator
+# calls them in memory instead of through the mcp server
+async def get_agent_cards():
+    """Get all agent cards and agent skills."""
+    return await agent_registry.cards()
+
+
+async def call_agent(
+    agent_url: str,
+    query: str,
+    session_id: str,
+    user_id: str,
+    tool_context: ToolContext,
+    blob_id: str = None,
+):
+    """Call the agent which can get the task done, pass the image blob id along when the query has one."""
+    payload = {
+        "query": query,
+        "session_id": session_id,
+        "user_id": user_id,
+        "blob_id": blob_id,
+    }
+
+    # The sub agent events go to the orchestrator turn that is streaming right now
+    async def on_event(event: dict):
+        await progress_relay.publish(
+            tool_context.user_id,
+            tool_context.session.id,
+            {"agent_url": agent_url, **event},
+        )
+
+    return await run_agent(agent_url, payload, on_event=on_event)
+
+
+ORCHESTRATOR_TOOLS = [get_agent_cards, call_agent]
@@ -1,12 +1,15 @@
 from google.adk.tools.mcp_tool.mcp_toolset import McpToolset, SseConnectionParams
 from google.adk.agents.llm_agent import LlmAgent
-from google.genai import types
-from google.adk.runners import Runner
 from dotenv import load_dotenv
-from app.schema.agent_message import AgentMessage
 from app.agent.base_agent import BaseAgent
+from app.agent.progress_relay import progress_relay
+from app.agent.orchestrator.router import PreRouter
+from app.schema.agent_message import AgentMessage
 from opik.integrations.adk import OpikTracer
+import aiohttp
+import asyncio
 import os
+import time
 
 load_dotenv()
 
@@ -14,6 +17,8 @@ load_dotenv()
 toolset = McpToolset(
     connection_params=SseConnectionParams(url=os.environ.get("MCP_SERVER_URL")),
     tool_filter=["get_agent_cards", "call_agent"],
+    # call_agent reports the sub agent events as progress, they are streamed on to the client
+    progress_callback=progress_relay.callback,
 )
 
 # Initalizing the agent Observability
@@ -33,45 +38,83 @@ orchestrator_agent_tracer = OpikTracer(
 # ErrorExtractor Agent Class
 class OrchestratorAgent(BaseAgent):
     # Intialize the agent variables
-    def __init__(self, app_name, session_service, agent):
+    def __init__(self, app_name, session_service, agent, router: PreRouter = None):
         super().__init__(app_name, session_service, agent)
+        self.router = router or PreRouter.from_env()
+
+    async def start(self):
+        await self.router.start()
+
+    async def close(self):
+        await self.router.close()
+
+    # Obvious intents go straight to their agent, the llm only routes the rest
+    async def stream(self, message: AgentMessage):
+        agent_url = await self.router.route(message)
+        if agent_url is not None:
+            relayed = False
+            final_response = None
+            try:
+                async for event in self.router.dispatch(agent_url, message):
+                    relayed = True
+                    if event["type"] == "final_response":
+                        final_response = event["data"]
+                    yield event
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                # An agent that fails mid answer is not asked twice
+                if relayed:
+                    raise
+                self.router.agent_failed()
+            else:
+                # The llm takes the next turns of the session, it needs this one as context
+                await self.append_turn(message, final_response)
+                return
+
+        start = time.perf_counter()
+        call_started = None
+        agent_seconds = 0.0
+        async for event in self._stream_with_progress(message):
+            if event["type"] == "function_calls" and any(
+                call.name == "call_agent" for call in event["data"]
+            ):
+                call_started = time.perf_counter()
+            elif event["type"] == "function_responses" and call_started is not None:
+                agent_seconds += time.perf_counter() - call_started
+                call_started = None
+            yield event
+        if agent_seconds:
+            self.router.record_llm_turn(time.perf_counter() - start - agent_seconds)
 
-    # Get the current session
-    async def get_current_session(self, user_id: str, session_id: str):
-        current_session = await self.session_service.get_session(
-            app_name=self.app_name, user_id=user_id, session_id=session_id
-        )
-        if not current_session:
-            current_session = await self.session_service.create_session(
-                app_name=self.app_name, user_id=user_id, session_id=session_id
-            )
-        runner = Runner(
-            agent=self.agent,
-            app_name=self.app_name,
-            session_service=self.session_service,
-        )
-        return runner
+    # The llm turn with the progress of the delegated agent merged in as it arrives
+    async def _stream_with_progress(self, message: AgentMessage):
+        queue = asyncio.Queue()
+        progress_relay.open(message.user_id, message.session_id, queue)
 
-    # Agent Interaction
-    async def execute(self, message: AgentMessage):
-        runner = await self.get_current_session(
-            session_id=message.session_id, user_id=message.user_id
-        )
-        content = types.Content(role="user", parts=[types.Part(text=message.query)])
-        events = runner.run_async(
-            user_id=message.user_id, session_id=message.session_id, new_message=content
-        )
+        async def produce():
+            try:
+                async for event in BaseAgent.stream(self, message):
+                    await queue.put(event)
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
 
-        agent_response = {}
-        async for event in events:
-            if event.get_function_calls():
-                agent_response["function_calls"] = event.get_function_calls()
-            elif event.get_function_responses():
-                agent_response["function_responses"] = event.get_function_responses()
-            elif event.is_final_response():
-                agent_response["final_response"] = event.content.parts[0].text
+        producer = asyncio.create_task(produce())
+        try:
+            while (event := await queue.get()) is not None:
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        finally:
+            progress_relay.close(message.user_id, message.session_id)
+            if not producer.done():
+                producer.cancel()
 
-        return agent_response
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "router": self.router.stats(),
+            "progress_relay": progress_relay.stats(),
+        }
 
 
 # Initalizing the error extractor agent
@@ -81,6 +124,7 @@ orchestrator_agent = LlmAgent(
     instruction="""
     You are CodingBuddy Orchestrator, an intelligent coordinator.
     Get all the agent cards and choice the right now and delgate the work to that agent.
+    When the query has an image blob id pass it unchanged as blob_id to call_agent.
     """,
     tools=[toolset],
     disallow_transfer_to_parent=True,
@@ -0,0 +1,164 @@
+import os
+import re
+import time
+import aiohttp
+from app.client.sse import read_sse_events
+from app.schema.agent_message import AgentMessage
+from app.tools.agent_registry import AgentRegistry
+from app.tools.http_pool import HttpClientPool
+from app.tools.stack_trace import parse_stack_trace
+
+IMAGE_PATH_RE = re.compile(r"\S+\.(?:png|jpe?g|gif|bmp|webp)", re.IGNORECASE)
+
+
+# A screenshot was uploaded or the query is nothing but an image path, a question that
+# only mentions an image file is left to the llm
+def _image_intent(message: AgentMessage):
+    return bool(
+        message.blob_id or IMAGE_PATH_RE.fullmatch(message.query.strip().strip("'\""))
+    )
+
+
+def _stack_trace_intent(message: AgentMessage):
+    return bool(parse_stack_trace(message.query)["frames"])
+
+
+# Intent name -> (detector, skill tags of the agent card that handles it)
+INTENTS = {
+    "image": (_image_intent, {"image", "screenshot"}),
+    "stack trace": (_stack_trace_intent, {"stack trace"}),
+}
+
+
+def register_intent(name: str, detector, tags: set):
+    INTENTS[name] = (detector, set(tags))
+
+
+def _skill_tags(card: dict):
+    skills = card.get("skills") or []
+    # A card with a single skill may list it as a plain object
+    if isinstance(skills, dict):
+        skills = [skills]
+    return {tag.lower() for skill in skills for tag in skill.get("tags", [])}
+
+
+# Deterministic routing in front of the orchestrator llm, obvious intents go straight to the
+# agent whose card claims them and everything else is left to the llm
+class PreRouter:
+    def __init__(
+        self,
+        enabled: bool,
+        registry: AgentRegistry,
+        pool: HttpClientPool,
+        timeout: float = 300,
+    ):
+        self.enabled = enabled
+        self.registry = registry
+        self.pool = pool
+        self.timeout = timeout
+        self._counters = {
+            "routed": 0,
+            "fallback_no_intent": 0,
+            "fallback_ambiguous": 0,
+            "fallback_no_agent": 0,
+            "fallback_agent_error": 0,
+        }
+        self.routes = {}
+        self._route_seconds = 0.0
+        # Time the llm spends on a turn outside of the delegated agent call
+        self._llm_turns = 0
+        self._llm_seconds = 0.0
+
+    @classmethod
+    def from_env(cls):
+        pool = HttpClientPool.from_env()
+        return cls(
+            enabled=os.environ.get("ORCHESTRATOR_PREROUTE", "true").lower() == "true",
+            registry=AgentRegistry.from_env(session=pool.session),
+            pool=pool,
+            timeout=float(os.environ.get("AGENT_CALL_TIMEOUT", 300)),
+        )
+
+    # Open the connection pool and keep the agent cards fresh while the server runs
+    async def start(self):
+        await self.pool.start()
+        self.registry.start()
+
+    async def close(self):
+        await self.registry.close()
+        await self.pool.close()
+
+    def _fallback(self, reason: str):
+        self._counters[f"fallback_{reason}"] += 1
+        return None
+
+    # Url of the agent to call directly, None when the llm has to decide
+    async def route(self, message: AgentMessage):
+        if not self.enabled:
+            return None
+        start = time.perf_counter()
+        try:
+            intents = [
+                tags for detector, tags in INTENTS.values() if detector(message)
+            ]
+            if not intents:
+                return self._fallback("no_intent")
+            if len(intents) > 1:
+                return self._fallback("ambiguous")
+            agents = [
+                url
+                for url, card in (await self.registry.agents()).items()
+                if _skill_tags(card) & intents[0]
+            ]
+            if not agents:
+                return self._fallback("no_agent")
+            if len(agents) > 1:
+                return self._fallback("ambiguous")
+            return agents[0]
+        finally:
+            self._route_seconds += time.perf_counter() - start
+
+    # Stream the events of the chosen agent, the same events call_agent would have relayed
+    async def dispatch(self, agent_url: str, message: AgentMessage):
+        if self.registry.local.get(agent_url) is not None:
+            async for event in self.registry.local.stream(agent_url, message):
+                yield event
+        else:
+            async with self.pool.session().post(
+                url=f"{agent_url}/run/stream",
+                json=message.model_dump(),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            ) as response:
+                response.raise_for_status()
+                async for event in read_sse_events(response):
+                    yield event
+        self._counters["routed"] += 1
+        self.routes[agent_url] = self.routes.get(agent_url, 0) + 1
+
+    def agent_failed(self):
+        self._counters["fallback_agent_error"] += 1
+
+    def record_llm_turn(self, seconds: float):
+        self._llm_turns += 1
+        self._llm_seconds += seconds
+
+    def stats(self) -> dict:
+        decisions = sum(self._counters.values())
+        llm_ms = self._llm_seconds / self._llm_turns * 1000 if self._llm_turns else None
+        return {
+            "enabled": self.enabled,
+            **self._counters,
+            "routed_ratio": round(self._counters["routed"] / decisions, 3)
+            if decisions
+            else 0,
+            "routes": self.routes,
+            "route_ms": round(self._route_seconds * 1000, 3),
+            "llm_routing_ms_avg": round(llm_ms, 1) if llm_ms is not None else None,
+            # Every routed turn saves the llm routing time measured on the fallback turns
+            "latency_saved_ms": round(
+                self._counters["routed"] * llm_ms - self._route_seconds * 1000, 1
+            )
+            if llm_ms is not None
+            else None,
+            "agent_registry": self.registry.stats(),
+        }
@@ -1,6 +1,6 @@
 import uvicorn
 from app.agent.agent_creator import create_agent
-from google.adk.sessions import InMemorySessionService
+from app.agent.session_service import create_session_service
 from app.agent.orchestrator.agent import OrchestratorAgent, orchestrator_agent
 import os
 
@@ -25,7 +25,7 @@ orchestrator_agent_card = {
     ],
 }
 # Initalizing the agent session service
-session_service = InMemorySessionService()
+session_service = create_session_service()
 agent_runner = OrchestratorAgent(
     app_name=os.environ.get("APP_NAME"),
     session_service=session_service,
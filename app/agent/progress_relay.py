@@ -0,0 +1,47 @@
+import json
+
+
+# Hands the progress of a delegated agent to the orchestrator turn that delegated it, the
+# mcp progress notifications of call_agent and the in process call_agent both end up here
+class ProgressRelay:
+    def __init__(self):
+        # (user_id, session_id) -> queue of the turn being streamed
+        self._queues = {}
+        self._counters = {"relayed": 0, "dropped": 0}
+
+    def open(self, user_id: str, session_id: str, queue):
+        self._queues[(user_id, session_id)] = queue
+
+    def close(self, user_id: str, session_id: str):
+        self._queues.pop((user_id, session_id), None)
+
+    async def publish(self, user_id: str, session_id: str, event: dict):
+        queue = self._queues.get((user_id, session_id))
+        if queue is None:
+            self._counters["dropped"] += 1
+            return
+        self._counters["relayed"] += 1
+        await queue.put({"type": "progress", "data": event})
+
+    # Progress callback factory for McpToolset, the message of each notification is a
+    # json encoded sub agent event
+    def callback(self, tool_name: str, *, callback_context=None, **kwargs):
+        if tool_name != "call_agent" or callback_context is None:
+            return None
+        user_id = callback_context.user_id
+        session_id = callback_context.session.id
+
+        async def on_progress(progress, total, message):
+            try:
+                event = json.loads(message or "")
+            except ValueError:
+                event = {"type": "progress", "data": message}
+            await self.publish(user_id, session_id, event)
+
+        return on_progress
+
+    def stats(self) -> dict:
+        return {"open_turns": len(self._queues), **self._counters}
+
+
+progress_relay = ProgressRelay()
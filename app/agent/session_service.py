@@ -0,0 +1,195 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from google.adk.sessions import BaseSessionService, InMemorySessionService
+
+
+# Session backends by name, a redis backend only needs to register a factory here
+def _memory_backend():
+    return InMemorySessionService()
+
+
+# Sqlite locally and postgres for shared replicas, the async sqlalchemy service needs async drivers
+def _database_backend():
+    from google.adk.sessions import DatabaseSessionService
+
+    db_url = os.environ.get("SESSION_DB_URL", "sqlite+aiosqlite:///./sessions.db")
+    return DatabaseSessionService(db_url=db_url)
+
+
+SESSION_BACKENDS = {
+    "memory": _memory_backend,
+    "sqlite": _database_backend,
+    "database": _database_backend,
+}
+
+
+def register_session_backend(name: str, factory):
+    SESSION_BACKENDS[name] = factory
+
+
+# Wraps a session backend with batched event writes, idle session eviction and a session cap
+class ManagedSessionService(BaseSessionService):
+    def __init__(
+        self,
+        backend: BaseSessionService,
+        batch_writes: bool = True,
+        idle_ttl: float = 24 * 60 * 60,
+        max_sessions: int = 1000,
+        sweep_interval: float = 300,
+    ):
+        self.backend = backend
+        self.batch_writes = batch_writes
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        # (app_name, user_id, session_id) -> last access time
+        self._sessions = OrderedDict()
+        # (app_name, user_id, session_id) -> events waiting to be written
+        self._pending = {}
+        self._sweeper = None
+        # Called with (app_name, user_id, session_id) whenever a session is deleted
+        self._delete_listeners = []
+        self._counters = {"events_written": 0, "flushes": 0, "evicted": 0}
+
+    @classmethod
+    def from_env(cls):
+        backend_name = os.environ.get("SESSION_BACKEND", "memory")
+        if backend_name not in SESSION_BACKENDS:
+            raise ValueError(f"Unknown session backend {backend_name}")
+        return cls(
+            backend=SESSION_BACKENDS[backend_name](),
+            batch_writes=os.environ.get("SESSION_BATCH_WRITES", "true").lower()
+            == "true",
+            idle_ttl=float(os.environ.get("SESSION_IDLE_TTL", 24 * 60 * 60)),
+            max_sessions=int(os.environ.get("SESSION_MAX_SESSIONS", 1000)),
+            sweep_interval=float(os.environ.get("SESSION_SWEEP_INTERVAL", 300)),
+        )
+
+    def add_delete_listener(self, listener):
+        self._delete_listeners.append(listener)
+
+    def _touch(self, app_name: str, user_id: str, session_id: str):
+        key = (app_name, user_id, session_id)
+        self._sessions[key] = time.time()
+        self._sessions.move_to_end(key)
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def create_session(
+        self, *, app_name, user_id, state=None, session_id=None
+    ):
+        session = await self.backend.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        self._touch(app_name, user_id, session.id)
+        await self._enforce_cap()
+        return session
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        # Reads always see the buffered writes of the session
+        await self.flush_session(app_name, user_id, session_id)
+        session = await self.backend.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is not None:
+            self._touch(app_name, user_id, session_id)
+        return session
+
+    async def list_sessions(self, *, app_name, user_id=None):
+        return await self.backend.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        key = (app_name, user_id, session_id)
+        self._sessions.pop(key, None)
+        self._pending.pop(key, None)
+        await self.backend.delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        for listener in self._delete_listeners:
+            listener(app_name, user_id, session_id)
+
+    # Events are applied to the in flight session right away and written to the backend on flush
+    async def append_event(self, session, event):
+        if not self.batch_writes:
+            self._counters["events_written"] += 1
+            return await self.backend.append_event(session, event)
+        if event.partial:
+            return event
+        event = await super().append_event(session, event)
+        key = (session.app_name, session.user_id, session.id)
+        self._pending.setdefault(key, []).append(event)
+        return event
+
+    # Write all the events buffered during a turn in one go
+    async def flush_session(self, app_name: str, user_id: str, session_id: str):
+        events = self._pending.pop((app_name, user_id, session_id), None)
+        if not events:
+            return
+        stored = await self.backend.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        if stored is None:
+            return
+        for event in events:
+            await self.backend.append_event(stored, event)
+        self._counters["events_written"] += len(events)
+        self._counters["flushes"] += 1
+
+    # Drop the least recently used sessions once the cap is reached, shared backends
+    # are only forgotten locally since other replicas may still be using them
+    async def _enforce_cap(self):
+        while len(self._sessions) > self.max_sessions:
+            app_name, user_id, session_id = next(iter(self._sessions))
+            if isinstance(self.backend, InMemorySessionService):
+                await self.delete_session(
+                    app_name=app_name, user_id=user_id, session_id=session_id
+                )
+                self._counters["evicted"] += 1
+            else:
+                self._sessions.popitem(last=False)
+                for listener in self._delete_listeners:
+                    listener(app_name, user_id, session_id)
+
+    # Delete sessions nobody used for longer than the idle ttl
+    async def evict_idle_sessions(self):
+        cutoff = time.time() - self.idle_ttl
+        for key, last_access in list(self._sessions.items()):
+            if last_access > cutoff or key in self._pending:
+                continue
+            app_name, user_id, session_id = key
+            session = await self.backend.get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+            # Another replica may have used the session since this one last did
+            if session is not None and session.last_update_time > cutoff:
+                self._sessions[key] = session.last_update_time
+                continue
+            await self.delete_session(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+            self._counters["evicted"] += 1
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.evict_idle_sessions()
+            except Exception:
+                # Keep sweeping, a failed pass is retried on the next interval
+                continue
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "sessions": len(self._sessions),
+            "pending_events": sum(len(e) for e in self._pending.values()),
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            **self._counters,
+        }
+
+
+def create_session_service():
+    return ManagedSessionService.from_env()
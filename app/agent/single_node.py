@@ -0,0 +1,31 @@
+import asyncio
+import uvicorn
+from app.agent.error_extractor.server import (
+    agent_runner as error_extractor_runner,
+    error_executor_agent_card,
+)
+from app.agent.local_tools import ORCHESTRATOR_TOOLS
+from app.agent.orchestrator.agent import orchestrator_agent
+from app.agent.orchestrator.server import app as orchestrator_app
+from app.agent.stackredhub.server import (
+    agent_runner as stackredhub_runner,
+    stackredhub_agent_card,
+)
+from app.tools.agent_registry import local_agents
+from app.tools.tool_server import serve_mcp_server
+
+
+# Every agent and the mcp server in one process, the orchestrator reaches its tools and
+# the sub agents in memory, the sub agents still get their search tools over mcp
+async def serve_single_node():
+    local_agents.register(error_extractor_runner, error_executor_agent_card)
+    local_agents.register(stackredhub_runner, stackredhub_agent_card)
+    orchestrator_agent.tools = ORCHESTRATOR_TOOLS
+    orchestrator = uvicorn.Server(
+        uvicorn.Config(orchestrator_app, host="0.0.0.0", port=8002)
+    )
+    await asyncio.gather(serve_mcp_server(), orchestrator.serve())
+
+
+def start_single_node():
+    asyncio.run(serve_single_node())
@@ -1,11 +1,8 @@
 from google.adk.tools.mcp_tool.mcp_toolset import McpToolset, SseConnectionParams
 from google.adk.agents.llm_agent import LlmAgent
-from google.genai import types
 
 # from google.adk.sessions import InMemorySessionService
-from google.adk.runners import Runner
 from dotenv import load_dotenv
-from app.schema.agent_message import AgentMessage
 from app.agent.base_agent import BaseAgent
 from opik.integrations.adk import OpikTracer
 import os
@@ -16,6 +13,10 @@ load_dotenv()
 toolset = McpToolset(
     connection_params=SseConnectionParams(url=os.environ.get("MCP_SERVER_URL")),
     tool_filter=[
+        "search_local_index",
+        "semantic_search",
+        "save_resolution",
+        "search_all_sources",
         "github_related_issues",
         "reddit_related_issues",
         "search_by_error_stackoverflow",
@@ -56,43 +57,6 @@ class StackRedHub(BaseAgent):
     def __init__(self, app_name, session_service, agent):
         super().__init__(app_name, session_service, agent)
 
-    # Get the current session
-    async def get_current_session(self, user_id: str, session_id: str):
-        current_session = await self.session_service.get_session(
-            app_name=self.app_name, user_id=user_id, session_id=session_id
-        )
-        if not current_session:
-            current_session = await self.session_service.create_session(
-                app_name=self.app_name, user_id=user_id, session_id=session_id
-            )
-        runner = Runner(
-            agent=self.agent,
-            app_name=self.app_name,
-            session_service=self.session_service,
-        )
-        return runner
-
-    # Agent Interaction
-    async def execute(self, message: AgentMessage):
-        runner = await self.get_current_session(
-            session_id=message.session_id, user_id=message.user_id
-        )
-        content = types.Content(role="user", parts=[types.Part(text=message.query)])
-        events = runner.run_async(
-            user_id=message.user_id, session_id=message.session_id, new_message=content
-        )
-
-        agent_response = {}
-        async for event in events:
-            if event.get_function_calls():
-                agent_response["function_calls"] = event.get_function_calls()
-            elif event.get_function_responses():
-                agent_response["function_responses"] = event.get_function_responses()
-            elif event.is_final_response():
-                agent_response["final_response"] = event.content.parts[0].text
-
-        return agent_response
-
 
 # Initalizing the error extractor agent
 stackredhub_agent = LlmAgent(
@@ -102,6 +66,12 @@ stackredhub_agent = LlmAgent(
     You are CodingBuddy, an AI specialized in quickly tracing and resolving coding issues. 
     Search GitHub, Stack Overflow, and Reddit to find the most relevant fix, 
     and return a clear one-line solution for the developer to apply immediately.
+    First check search_local_index, when it reports a hit answer from it without searching online.
+    Without a hit try semantic_search, which also finds the same error worded differently,
+    answer from it only when it reports a hit, its other results are just candidates.
+    Otherwise use search_all_sources which searches every source in one call,
+    only use the single source tools when you need more detail from one of them.
+    Once you found the fix from an online source call save_resolution with the error and the fix.
     """,
     tools=[toolset],
     disallow_transfer_to_parent=True,
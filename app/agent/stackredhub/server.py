@@ -1,6 +1,6 @@
 import uvicorn
 from app.agent.agent_creator import create_agent
-from google.adk.sessions import InMemorySessionService
+from app.agent.session_service import create_session_service
 from app.agent.stackredhub.agent import StackRedHub, stackredhub_agent
 import os
 
@@ -13,6 +13,16 @@ stackredhub_agent_card = {
         "url": "http://localhost:8001",
     },
     "skills": [
+        {
+            "name": "Local Resolution Index",
+            "description": "Answer errors resolved before, including differently worded ones, from the local index of previous resolutions.",
+            "tags": ["error", "local", "index", "resolutions", "semantic"],
+        },
+        {
+            "name": "Search All Sources",
+            "description": "Search GitHub, Reddit and Stack Overflow concurrently and return one merged, ranked list.",
+            "tags": ["search", "github", "reddit", "stackoverflow"],
+        },
         {
             "name": "Extracting Error",
             "description": "Generates a detailed report of what caused the error",
@@ -46,7 +56,7 @@ stackredhub_agent_card = {
     ],
 }
 # Initalizing the agent session service
-session_service = InMemorySessionService()
+session_service = create_session_service()
 agent_runner = StackRedHub(
     app_name=os.environ.get("APP_NAME"),
     session_service=session_service,
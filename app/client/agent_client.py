@@ -4,49 +4,88 @@ import asyncio
 from datetime import datetime
 import aiohttp
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
-from rich.table import Table
-from rich.text import Text
 import os
 from dotenv import load_dotenv
 import mss
+import mss.tools
+from app.client.chat_view import ChatRow, ChatView
+from app.client.sse import read_sse_events
+from app.client.transcript_store import TranscriptStore
 
 load_dotenv()
 
 console = Console()
 
-ROLE_STYLES = {
-    "You": "bold white on blue",
-    "Agent": "bold white on green",
-    "Tool Calling": "bold white on red",
-    "Session": "bold white on magenta",
-    "Tool Response": "bold black on cyan",
+# Chat role and style used for each streamed agent event
+EVENT_ROLES = {
+    "final_response": ("Agent", "green"),
+    "function_calls": ("Tool Calling", "red"),
+    "function_responses": ("Tool Response", "cyan"),
+    "error": ("Agent", "bold red"),
+    # Tool calls and responses of the agent the orchestrator delegated to
+    "progress": ("Sub Agent", "magenta"),
 }
 
-INDENT_ROLES = set()
 USER_ID = os.environ.get("USER_ID")
+# Monitor captured by /fix, 1 is the primary monitor and 0 is all the monitors together
+SCREENSHOT_MONITOR = int(os.environ.get("SCREENSHOT_MONITOR", 1))
+BLOB_STORE_URL = os.environ.get("BLOB_STORE_URL", "http://localhost:8005/blobs")
+ORCHESTRATOR_URL = os.environ.get("ORCHESTRATOR_URL", "http://localhost:8002")
 
 
 def time_now():
     return datetime.now().strftime("%H:%M:%S")
 
 
-def render_chat(turn_messages):
-    console.clear()
-    table = Table.grid(padding=(0, 1))
-    table.add_column("Header", width=20, no_wrap=True)
-    table.add_column("Message")
+# Add a message to the session transcript, rows are numbered so /show can find them
+def add_row(store: TranscriptStore, session: str, author: str, data, style: str = ""):
+    row = ChatRow(store.last_number(session) + 1, author, time_now(), data, style)
+    store.append(session, row)
+    return row
 
-    for author, timestamp, content in turn_messages:
-        badge_style = ROLE_STYLES.get(author, "bold white on grey")
-        header = Text(f"[{author}]", style=badge_style) + Text(
-            f" {timestamp}", style="dim"
-        )
-        indent = "    " if author in INDENT_ROLES else ""
-        table.add_row(header, Text(indent) + content)
 
-    panel = Panel(table, title="Chat", padding=(1, 2))
-    console.print(panel)
+# Print rows once, earlier output stays in the terminal scrollback instead of being redrawn
+def print_rows(rows: list):
+    view = ChatView()
+    for row in rows:
+        view.add(row)
+    console.print(Panel(view, title="Chat", padding=(1, 2)))
+
+
+# Open a session and show its newest page, returns the number of the oldest message shown
+def open_session(store: TranscriptStore, session_name: str):
+    rows = store.page(session_name, limit=ChatView().visible_rows)
+    if not rows:
+        rows = [add_row(store, session_name, "Session", f"Current Session: {session_name}")]
+    print_rows(rows)
+    console.print(
+        "[dim]/fix reads the error on screen, /show <number> prints a message in full, "
+        "/history shows older messages, /switch changes the session[/dim]"
+    )
+    return rows[0].number
+
+
+# Print the page before the oldest message shown so far
+def show_history(store: TranscriptStore, session_name: str, oldest_shown: int):
+    rows = store.page(session_name, before=oldest_shown, limit=ChatView().visible_rows)
+    if not rows:
+        console.print("[dim]No older messages[/dim]")
+        return oldest_shown
+    print_rows(rows)
+    return rows[0].number
+
+
+# Expand a collapsed tool payload, /show <message number>
+def show_row(store: TranscriptStore, session_name: str, command: str):
+    number = command.split(maxsplit=1)[1] if " " in command else ""
+    row = store.get(session_name, int(number)) if number.isdigit() else None
+    if row is None:
+        console.print("[bold red]Usage: /show <message number>[/bold red]")
+        return
+    console.print(row.header())
+    console.print(row.expanded())
 
 
 async def select_session(sessions):
@@ -72,38 +111,89 @@ async def select_session(sessions):
         console.print("[bold red]Invalid input. Try again.[/bold red]")
 
 
+# Capture the configured monitor as png bytes in memory
+def take_screenshot():
+    with mss.mss() as sct:
+        shot = sct.grab(sct.monitors[SCREENSHOT_MONITOR])
+        return mss.tools.to_png(shot.rgb, shot.size)
+
+
+# One http session for the whole cli run so every turn reuses the open connections
+class CodingBuddyClient:
+    def __init__(self, orchestrator_url: str = ORCHESTRATOR_URL):
+        self.orchestrator_url = orchestrator_url
+        self._session = None
+
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    # Upload the screenshot once, the agents only pass its blob id around
+    async def upload_screenshot(self):
+        # Capturing and png encoding the screen is slow, keep it off the event loop
+        image = await asyncio.to_thread(take_screenshot)
+        async with self.session().post(
+            url=BLOB_STORE_URL,
+            data=image,
+            headers={"Content-Type": "application/octet-stream"},
+        ) as response:
+            blob = await response.json()
+        return blob["blob_id"]
+
+    # Stream the orchestrator events as they arrive
+    async def stream(self, query: str, session_id: str, fix: bool = False):
+        payload = {"query": query, "session_id": session_id, "user_id": USER_ID}
+        if fix:
+            payload["query"] = "Extract the error from the image"
+            payload["blob_id"] = await self.upload_screenshot()
+        async with self.session().post(
+            url=f"{self.orchestrator_url}/run/stream", json=payload
+        ) as response:
+            response.raise_for_status()
+            async for event in read_sse_events(response):
+                yield event
+
+    async def call(self, query: str, session_id: str, fix: bool = False):
+        agent_response = {}
+        async for event in self.stream(query, session_id, fix=fix):
+            agent_response[event["type"]] = event["data"]
+        return agent_response
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+client = CodingBuddyClient()
+
+
+async def stream_coding_buddy(query: str, session_id: str, fix: bool = False):
+    async for event in client.stream(query, session_id, fix=fix):
+        yield event
+
+
 async def call_coding_buddy(query: str, session_id: str, fix: bool = False):
-    if fix:
-        with mss.mss() as sct:
-            # Grab the entire screen
-            screenshot = sct.shot(output="error.png")
-            query = (
-                f"Here is the Image Path:{screenshot} Extract the error from the image"
-            )
+    return await client.call(query, session_id, fix=fix)
 
-    url = "http://localhost:8002/run"
-    payload = {"query": query, "session_id": session_id, "user_id": USER_ID}
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url=url, json=payload) as response:
-            r = await response.json()
-            return r
 
+# Read the events off the network while the previous ones are being rendered
+async def _receive_events(events, queue: asyncio.Queue):
+    try:
+        async for event in events:
+            await queue.put(event)
+    except Exception as e:
+        await queue.put({"type": "error", "data": str(e) or type(e).__name__})
+    finally:
+        await queue.put(None)
 
-async def main():
-    sessions_data = {}
 
-    # Initial session selection/creation
-    session_name = await select_session(list(sessions_data.keys()))
-    if session_name not in sessions_data:
-        sessions_data[session_name] = []
-        sessions_data[session_name].append(
-            ("Session", time_now(), Text(f"Current Session: {session_name}"))
-        )
-        render_chat([sessions_data[session_name][-1]])
+async def main(store: TranscriptStore):
+    # Initial session selection/creation, the transcripts of earlier runs are on disk
+    session_name = await select_session(store.list_sessions())
+    oldest_shown = open_session(store, session_name)
 
     while True:
-        turn_messages = []
-
         prompt = f"[bold blue]{session_name} > You[/bold blue] "
         user_input = await asyncio.to_thread(console.input, prompt)
         user_input = user_input.strip()
@@ -114,71 +204,65 @@ async def main():
 
         # Check for session switch keyword
         if user_input.lower() == "/switch":
-            session_name = await select_session(list(sessions_data.keys()))
-            if session_name not in sessions_data:
-                sessions_data[session_name] = []
-                sessions_data[session_name].append(
-                    ("Session", time_now(), Text(f"Current Session: {session_name}"))
-                )
-            render_chat([sessions_data[session_name][-1]])
+            session_name = await select_session(store.list_sessions())
+            oldest_shown = open_session(store, session_name)
             continue
 
         if user_input.lower() == "/exit":
             break
 
-        if user_input.lower() == "/fix":
-            agent_response = await call_coding_buddy(
-                query=user_input, session_id=session_name, fix=True
-            )
+        if user_input.lower().startswith("/show"):
+            show_row(store, session_name, user_input)
+            continue
 
-        agent_response = await call_coding_buddy(
-            query=user_input, session_id=session_name
-        )
+        if user_input.lower() == "/history":
+            oldest_shown = show_history(store, session_name, oldest_shown)
+            continue
 
-        # User message
-        turn_messages.append(("You", time_now(), Text(user_input, style="blue")))
-        sessions_data[session_name].extend(turn_messages)
-        render_chat(turn_messages)
-
-        # Agent Response
-        turn_messages.append(
-            (
-                "Agent",
-                time_now(),
-                Text(agent_response.get("final_response"), style="green"),
-            )
-        )
-        sessions_data[session_name].append(turn_messages[-1])
-        render_chat(turn_messages)
-
-        # Tool calling
-        turn_messages.append(
-            (
-                "Tool Calling",
-                time_now(),
-                Text(
-                    str([f for f in agent_response.get("function_calls", [])]),
-                    style="red",
-                ),
-            )
-        )
-        sessions_data[session_name].append(turn_messages[-1])
-        render_chat(turn_messages)
-
-        # Tool response
-        turn_messages.append(
-            (
-                "Tool Response",
-                time_now(),
-                Text(
-                    str([f for f in agent_response.get("function_responses", [])]),
-                    style="cyan",
-                ),
-            )
+        # Only the rows of this turn are redrawn, each one is built once
+        turn = ChatView()
+        turn.add(add_row(store, session_name, "You", user_input, "blue"))
+
+        # One request per intent, /fix sends the screenshot instead of the text
+        events = client.stream(
+            query=user_input,
+            session_id=session_name,
+            fix=user_input.lower() == "/fix",
         )
-        sessions_data[session_name].append(turn_messages[-1])
-        render_chat(turn_messages)
+        queue = asyncio.Queue()
+        receiver = asyncio.create_task(_receive_events(events, queue))
+
+        with Live(
+            Panel(turn, title="Chat", padding=(1, 2)), console=console, auto_refresh=False
+        ) as live:
+            live.refresh()
+            # Draw the events that arrived since the last refresh in one go
+            done = False
+            while not done:
+                pending = [await queue.get()]
+                while not queue.empty():
+                    pending.append(queue.get_nowait())
+                for event in pending:
+                    if event is None:
+                        done = True
+                        break
+                    author, style = EVENT_ROLES.get(event["type"], ("Agent", "green"))
+                    data = event["data"]
+                    if event["type"] == "progress" and isinstance(data, dict):
+                        data = data.get("data")
+                    turn.add(add_row(store, session_name, author, data, style))
+                live.refresh()
+        await receiver
+
+
+async def run_coding_buddy():
+    store = TranscriptStore.from_env()
+    try:
+        await main(store)
+    finally:
+        await client.close()
+        store.close()
 
 
 def start_coding_buddy():
-    asyncio.run(main())
+    asyncio.run(run_coding_buddy())
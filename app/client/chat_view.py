@@ -0,0 +1,95 @@
+import json
+import os
+from rich.console import Group
+from rich.json import JSON
+from rich.table import Table
+from rich.text import Text
+
+ROLE_STYLES = {
+    "You": "bold white on blue",
+    "Agent": "bold white on green",
+    "Tool Calling": "bold white on red",
+    "Session": "bold white on magenta",
+    "Tool Response": "bold black on cyan",
+    "Sub Agent": "bold white on dark_magenta",
+}
+INDENT_ROLES = set()
+# Longest line of a tool payload shown in the chat, /show prints the whole payload
+PAYLOAD_PREVIEW_CHARS = int(os.environ.get("CHAT_PAYLOAD_PREVIEW_CHARS", 200))
+# Rows drawn while a turn is streaming, older rows of the turn are counted but not drawn
+VISIBLE_ROWS = int(os.environ.get("CHAT_VISIBLE_ROWS", 30))
+
+
+def _clip(text: str, max_chars: int):
+    return text if len(text) <= max_chars else text[:max_chars] + "…"
+
+
+# One line per tool call or response, only the start of the arguments or result is kept
+def preview_payload(data, max_chars: int = PAYLOAD_PREVIEW_CHARS):
+    if isinstance(data, str):
+        return data
+    items = data if isinstance(data, list) else [data]
+    lines = []
+    for item in items:
+        if isinstance(item, dict) and "name" in item:
+            body = item.get("args", item.get("response"))
+            summary = json.dumps(body, default=str, ensure_ascii=False)
+            lines.append(f"{item['name']}: {_clip(summary, max_chars)}")
+        else:
+            lines.append(_clip(json.dumps(item, default=str, ensure_ascii=False), max_chars))
+    return "\n".join(lines)
+
+
+# A chat message, its text is built once on first draw and large payloads stay collapsed
+class ChatRow:
+    def __init__(self, number: int, author: str, timestamp: str, data, style: str = ""):
+        self.number = number
+        self.author = author
+        self.timestamp = timestamp
+        self.data = data
+        self.style = style
+        self._content = None
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = Text(preview_payload(self.data), style=self.style)
+        return self._content
+
+    def header(self):
+        badge_style = ROLE_STYLES.get(self.author, "bold white on grey")
+        return (
+            Text(f"#{self.number} ", style="dim")
+            + Text(f"[{self.author}]", style=badge_style)
+            + Text(f" {self.timestamp}", style="dim")
+        )
+
+    # Whole payload, only built when asked for with /show
+    def expanded(self):
+        if isinstance(self.data, str):
+            return Text(self.data, style=self.style)
+        return JSON(json.dumps(self.data, default=str))
+
+
+# Rows of the chat, drawn as a window over the newest rows so long turns stay cheap to redraw
+class ChatView:
+    def __init__(self, visible_rows: int = VISIBLE_ROWS):
+        self.visible_rows = visible_rows
+        self.rows = []
+
+    def add(self, row: ChatRow):
+        self.rows.append(row)
+        return row
+
+    def __rich__(self):
+        table = Table.grid(padding=(0, 1))
+        table.add_column("Header", width=30, no_wrap=True)
+        table.add_column("Message")
+        hidden = len(self.rows) - self.visible_rows
+        for row in self.rows[max(hidden, 0) :]:
+            indent = "    " if row.author in INDENT_ROLES else ""
+            table.add_row(row.header(), Text(indent) + row.content)
+        if hidden > 0:
+            note = Text(f"… {hidden} earlier messages of this turn", style="dim")
+            return Group(note, table)
+        return table
@@ -0,0 +1,16 @@
+import json
+
+
+# Read the data events of a server sent event stream from an aiohttp response
+async def read_sse_events(response):
+    event_name = None
+    async for raw_line in response.content:
+        line = raw_line.decode("utf-8").rstrip("\r\n")
+        if line.startswith("event:"):
+            event_name = line[len("event:") :].strip()
+        elif line.startswith("data:"):
+            if event_name == "done":
+                return
+            yield json.loads(line[len("data:") :].strip())
+        elif not line:
+            event_name = None
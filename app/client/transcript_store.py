@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import time
+from app.client.chat_view import ChatRow, preview_payload
+
+
+# Longest prefix of the text whose json encoding fits in max_bytes, found by bisection
+# since escapes and multi byte characters make the encoded size differ from the length
+def _clip_bytes(text: str, max_bytes: int):
+    def size(n: int):
+        return len(json.dumps(text[:n] + "...", ensure_ascii=False).encode("utf-8"))
+
+    low, high = 0, min(len(text), max_bytes)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if size(middle) <= max_bytes:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + "..."
+
+
+# Sqlite store of the cli transcripts, only the page being shown is ever loaded
+class TranscriptStore:
+    def __init__(
+        self,
+        path: str,
+        max_messages: int = 5000,
+        max_sessions: int = 200,
+        max_message_bytes: int = 64 * 1024,
+    ):
+        self.path = path
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self.max_message_bytes = max_message_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS sessions (
+                name TEXT PRIMARY KEY,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                session TEXT NOT NULL,
+                number INTEGER NOT NULL,
+                author TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                style TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (session, number)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+            """
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            path=os.environ.get("CLI_HISTORY_PATH")
+            or os.path.join(os.path.expanduser("~"), ".coding_buddy", "history.db"),
+            max_messages=int(os.environ.get("CLI_HISTORY_MAX_MESSAGES", 5000)),
+            max_sessions=int(os.environ.get("CLI_HISTORY_MAX_SESSIONS", 200)),
+            max_message_bytes=int(
+                os.environ.get("CLI_HISTORY_MAX_MESSAGE_BYTES", 64 * 1024)
+            ),
+        )
+
+    # Session names, the most recently used first
+    def list_sessions(self):
+        rows = self._conn.execute(
+            "SELECT name FROM sessions ORDER BY updated_at DESC"
+        ).fetchall()
+        return [name for (name,) in rows]
+
+    # Number of the last message of a session, messages are numbered from 1
+    def last_number(self, session: str):
+        row = self._conn.execute(
+            "SELECT MAX(number) FROM messages WHERE session = ?", (session,)
+        ).fetchone()
+        return row[0] or 0
+
+    # Store a message and drop the oldest ones once a limit is reached
+    def append(self, session: str, row: ChatRow):
+        data = json.dumps(row.data, default=str, ensure_ascii=False)
+        if len(data.encode("utf-8")) > self.max_message_bytes:
+            # Oversized tool payloads are kept as their preview, text that is still too
+            # large, a long answer or a long preview, is cut to the limit
+            preview = preview_payload(row.data)
+            data = json.dumps(preview, ensure_ascii=False)
+            if len(data.encode("utf-8")) > self.max_message_bytes:
+                data = json.dumps(
+                    _clip_bytes(preview, self.max_message_bytes), ensure_ascii=False
+                )
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?)",
+            (session, row.number, row.author, row.timestamp, row.style, data),
+        )
+        self._conn.execute(
+            "INSERT INTO sessions (name, message_count, updated_at) VALUES (?, 1, ?) "
+            "ON CONFLICT (name) DO UPDATE SET "
+            "message_count = message_count + 1, updated_at = excluded.updated_at",
+            (session, now),
+        )
+        self._enforce_limits(session)
+        self._conn.commit()
+
+    def _enforce_limits(self, session: str):
+        (count,) = self._conn.execute(
+            "SELECT message_count FROM sessions WHERE name = ?", (session,)
+        ).fetchone()
+        if count > self.max_messages:
+            cutoff = self.last_number(session) - self.max_messages
+            deleted = self._conn.execute(
+                "DELETE FROM messages WHERE session = ? AND number <= ?", (session, cutoff)
+            ).rowcount
+            self._conn.execute(
+                "UPDATE sessions SET message_count = message_count - ? WHERE name = ?",
+                (deleted, session),
+            )
+        stale = self._conn.execute(
+            "SELECT name FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?",
+            (self.max_sessions,),
+        ).fetchall()
+        for (name,) in stale:
+            self._conn.execute("DELETE FROM messages WHERE session = ?", (name,))
+            self._conn.execute("DELETE FROM sessions WHERE name = ?", (name,))
+
+    def _row(self, number, author, timestamp, style, data):
+        return ChatRow(number, author, timestamp, json.loads(data), style)
+
+    # A page of messages ending right before the given number, the newest page by default
+    def page(self, session: str, before: int = None, limit: int = 30):
+        rows = self._conn.execute(
+            "SELECT number, author, timestamp, style, data FROM messages "
+            "WHERE session = ? AND number < ? ORDER BY number DESC LIMIT ?",
+            (session, before if before is not None else 2**62, limit),
+        ).fetchall()
+        return [self._row(*row) for row in reversed(rows)]
+
+    def get(self, session: str, number: int):
+        row = self._conn.execute(
+            "SELECT number, author, timestamp, style, data FROM messages "
+            "WHERE session = ? AND number = ?",
+            (session, number),
+        ).fetchone()
+        return self._row(*row) if row else None
+
+    def close(self):
+        self._conn.close()
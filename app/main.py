@@ -15,6 +15,7 @@
 # poetry run stackredhub_agent --> to run the error stackredhub_agent 
 # poetry run orchestrator_agent --> to run the orchestrator_agent
 # Each agent should run on seperate terminal
+# Or run everything in one process on a single machine --> poetry run single_node
 # After running all the agent run the coding buddy --> poetry run coding_buddy
 # Njoy Chatting
 # Make sure that the free version of gemini has a limit and u cant chat for along time 
\ No newline at end of file
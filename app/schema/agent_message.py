@@ -1,6 +1,9 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class AgentMessage(BaseModel):
     query: str
     session_id: str
     user_id: str
+    # Handle of a screenshot uploaded to the mcp server blob store
+    blob_id: Optional[str] = None
@@ -0,0 +1,202 @@
+import asyncio
+import os
+import re
+import time
+import aiohttp
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+# Agents hosted in this process on a single node deployment, keyed by the url of their
+# card so call_agent reaches them in memory instead of over http
+class LocalAgents:
+    def __init__(self):
+        self._agents = {}
+        self._cards = {}
+        self._calls = {}
+
+    def register(self, agent, card: dict):
+        url = card["agent"]["url"].rstrip("/")
+        self._agents[url] = agent
+        self._cards[url] = card
+        self._calls[url] = 0
+
+    def get(self, url: str):
+        return self._agents.get((url or "").rstrip("/"))
+
+    def cards(self):
+        return dict(self._cards)
+
+    # Same events as the /run/stream endpoint of the agent server
+    async def stream(self, url: str, message):
+        url = url.rstrip("/")
+        self._calls[url] += 1
+        async for event in self._agents[url].stream(message=message):
+            yield event
+
+    def stats(self) -> dict:
+        return {
+            url: {
+                "name": self._cards[url]["agent"]["name"],
+                "calls": self._calls[url],
+                **agent.stats(),
+            }
+            for url, agent in self._agents.items()
+        }
+
+
+# Filled by the single node entry point, empty when every agent runs its own server
+local_agents = LocalAgents()
+
+
+# In memory registry of the agent cards, refreshed in the background so discovery never
+# waits on the agents and an agent that stops answering is left out instead of blocking
+class AgentRegistry:
+    def __init__(
+        self,
+        urls: list[str],
+        session,
+        ttl: float = 300,
+        refresh_interval: float = 60,
+        timeout: float = 2,
+        local: LocalAgents = local_agents,
+    ):
+        self.urls = urls
+        self.local = local
+        # Callable returning the shared aiohttp session
+        self.session = session
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        # url -> card, etag, health and timings of the last fetch
+        self._entries = {url: {"card": None, "etag": None, "expires_at": 0} for url in urls}
+        self._refresher = None
+        self._refreshing = None
+        self._counters = {"refreshes": 0, "fetches": 0, "not_modified": 0, "failures": 0}
+
+    @classmethod
+    def from_env(cls, session):
+        urls = [url.strip() for url in os.environ.get("AGENT_URLS", "").split(",")]
+        return cls(
+            urls=[url for url in urls if url],
+            session=session,
+            ttl=float(os.environ.get("AGENT_CARD_TTL", 300)),
+            refresh_interval=float(os.environ.get("AGENT_CARD_REFRESH_INTERVAL", 60)),
+            timeout=float(os.environ.get("AGENT_CARD_TIMEOUT", 2)),
+        )
+
+    # Cards are kept as long as the agent allows with Cache-Control, the ttl otherwise
+    def _max_age(self, response):
+        match = _MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        return float(match.group(1)) if match else self.ttl
+
+    async def _fetch(self, url: str):
+        entry = self._entries[url]
+        headers = {"If-None-Match": entry["etag"]} if entry["etag"] else {}
+        start = time.perf_counter()
+        self._counters["fetches"] += 1
+        try:
+            async with self.session().get(
+                url=f"{url}/.well-known/agent.json",
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            ) as response:
+                if response.status == 304:
+                    self._counters["not_modified"] += 1
+                else:
+                    response.raise_for_status()
+                    entry["card"] = await response.json()
+                    entry["etag"] = response.headers.get("ETag")
+                entry["expires_at"] = time.time() + self._max_age(response)
+            entry["healthy"] = True
+            entry["error"] = None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self._counters["failures"] += 1
+            entry["healthy"] = False
+            entry["error"] = str(e) or type(e).__name__
+            # A dead agent is retried on the next refresh, not on every lookup
+            entry["expires_at"] = time.time() + self.refresh_interval
+        entry["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        entry["checked_at"] = time.time()
+
+    # Agents served over http, the ones hosted in this process are never fetched
+    def _remote_entries(self):
+        return {
+            url: entry
+            for url, entry in self._entries.items()
+            if self.local.get(url) is None
+        }
+
+    # Fetch the cards that expired, concurrent callers share the one refresh in flight
+    def _start_refresh(self, force: bool = False):
+        if self._refreshing is None or self._refreshing.done():
+            now = time.time()
+            urls = [
+                url
+                for url, entry in self._remote_entries().items()
+                if force or entry["expires_at"] <= now
+            ]
+            self._refreshing = asyncio.ensure_future(
+                asyncio.gather(*[self._fetch(url) for url in urls])
+            )
+            self._counters["refreshes"] += 1
+        return self._refreshing
+
+    async def refresh(self, force: bool = False):
+        await asyncio.shield(self._start_refresh(force))
+
+    # Url and card of the healthy agents, only the very first lookup waits on the agents
+    async def agents(self):
+        remote = self._remote_entries()
+        if any("checked_at" not in entry for entry in remote.values()):
+            await self.refresh()
+        elif any(entry["expires_at"] <= time.time() for entry in remote.values()):
+            # Stale cards are served while the refresh runs in the background
+            self._start_refresh()
+        return {
+            **{
+                url: entry["card"]
+                for url, entry in remote.items()
+                if entry["card"] is not None and entry.get("healthy")
+            },
+            **self.local.cards(),
+        }
+
+    async def cards(self):
+        return list((await self.agents()).values())
+
+    async def _refresh_forever(self):
+        while True:
+            try:
+                await self.refresh(force=True)
+            except Exception:
+                # Keep refreshing, a failed pass is retried on the next interval
+                pass
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self.urls and (self._refresher is None or self._refresher.done()):
+            self._refresher = asyncio.create_task(self._refresh_forever())
+
+    async def close(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "agents": {
+                url: {
+                    "healthy": entry.get("healthy"),
+                    "name": (entry["card"] or {}).get("agent", {}).get("name"),
+                    "latency_ms": entry.get("latency_ms"),
+                    "checked_at": entry.get("checked_at"),
+                    "error": entry.get("error"),
+                }
+                for url, entry in self._entries.items()
+            },
+            **self._counters,
+        }
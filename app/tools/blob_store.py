@@ -0,0 +1,64 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+
+# Bounded in memory store for uploaded screenshots, blobs are addressed by their sha256
+class BlobStore:
+    def __init__(
+        self, max_entries: int = 32, max_bytes: int = 64 * 1024 * 1024, ttl: float = 600
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # blob_id -> (expires_at, data)
+        self._blobs = OrderedDict()
+        self._bytes = 0
+        self._counters = {"puts": 0, "hits": 0, "misses": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.environ.get("BLOB_STORE_MAX_ENTRIES", 32)),
+            max_bytes=int(os.environ.get("BLOB_STORE_MAX_BYTES", 64 * 1024 * 1024)),
+            ttl=float(os.environ.get("BLOB_STORE_TTL", 600)),
+        )
+
+    def _remove(self, blob_id: str):
+        _, data = self._blobs.pop(blob_id)
+        self._bytes -= len(data)
+
+    def put(self, data: bytes) -> str:
+        if len(data) > self.max_bytes:
+            raise ValueError("blob is larger than the blob store")
+        blob_id = hashlib.sha256(data).hexdigest()
+        if blob_id in self._blobs:
+            self._remove(blob_id)
+        self._blobs[blob_id] = (time.time() + self.ttl, data)
+        self._bytes += len(data)
+        self._counters["puts"] += 1
+        while len(self._blobs) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._blobs)))
+            self._counters["evictions"] += 1
+        return blob_id
+
+    def get(self, blob_id: str):
+        entry = self._blobs.get(blob_id)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                self._remove(blob_id)
+            self._counters["misses"] += 1
+            return None
+        self._blobs.move_to_end(blob_id)
+        self._counters["hits"] += 1
+        return entry[1]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._blobs),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            **self._counters,
+        }
@@ -0,0 +1,196 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Parts of an error message that differ between machines and runs of the same error
+_NORMALIZERS = [
+    (re.compile(r"(?:[A-Za-z]:)?(?:[\\/][\w.\-@~]+)+[\\/]?"), " "),  # file paths
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), " "),  # memory addresses
+    (re.compile(r"\b[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}\b"), " "),  # uuids
+    (re.compile(r"\b[0-9a-fA-F]{12,}\b"), " "),  # hashes and hex ids
+    (re.compile(r"\bline \d+\b", re.IGNORECASE), " "),  # python line numbers
+    (re.compile(r":\d+(?::\d+)?\b"), " "),  # file:line:col suffixes
+    (re.compile(r"\b\d+\b"), " "),  # any other numbers
+]
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]+")
+# Exception names, quoted values and dotted module paths tell errors of the same kind apart
+_EXCEPTION_RE = re.compile(r"\b[A-Za-z_][\w.]*(?:Error|Exception|Warning|Exit|Interrupt)\b")
+_QUOTED_RE = re.compile(r"""['"`]([^'"`\n]{1,80})['"`]""")
+_DOTTED_RE = re.compile(r"\b[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)+\b")
+# An exception with its message, as it is quoted in the text of a question
+_STATEMENT_RE = re.compile(
+    r"\b[A-Za-z_][\w.]*(?:Error|Exception|Warning|Exit|Interrupt)\b:[^\n]{0,160}?(?=\. |$|\n)"
+)
+
+
+def normalize_error_message(text: str):
+    for pattern, replacement in _NORMALIZERS:
+        text = pattern.sub(replacement, text)
+    return " ".join(_TOKEN_RE.findall(text)).lower()
+
+
+def _tokens(text: str):
+    return set(normalize_error_message(text).split())
+
+
+# Tokens a signature must contain to be the same error and not just one of its kind
+def _key_tokens(text: str):
+    keys = set()
+    for pattern in (_EXCEPTION_RE, _QUOTED_RE, _DOTTED_RE):
+        for match in pattern.findall(text):
+            keys |= _tokens(match)
+    return keys
+
+
+# The exception lines quoted in a text, they make a short signature for a long question
+def error_statements(text: str):
+    return list(dict.fromkeys(match.strip() for match in _STATEMENT_RE.findall(text or "")))
+
+
+# Sqlite FTS5 index of resolved errors ranked with bm25
+class ErrorIndex:
+    def __init__(self, path: str, min_overlap: float = 0.6, ttl: float = 2592000):
+        self.path = path
+        self.min_overlap = min_overlap
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._counters = {"indexed": 0, "queries": 0, "hits": 0, "expired": 0}
+        with self._lock:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS resolutions (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT UNIQUE,
+                    source TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    resolution TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS resolutions_created ON resolutions (created_at);
+                CREATE VIRTUAL TABLE IF NOT EXISTS resolutions_fts USING fts5(
+                    signature, title, resolution
+                );
+                """
+            )
+            self._conn.commit()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            path=os.environ.get("ERROR_INDEX_PATH", "error_index.db"),
+            min_overlap=float(os.environ.get("ERROR_INDEX_MIN_OVERLAP", 0.6)),
+            ttl=float(os.environ.get("ERROR_INDEX_TTL", 2592000)),
+        )
+
+    # Drop the resolutions older than the ttl so their urls can be indexed again
+    def _purge_expired(self, now: float):
+        expired = [
+            row[0]
+            for row in self._conn.execute(
+                "SELECT id FROM resolutions WHERE created_at < ?", (now - self.ttl,)
+            )
+        ]
+        if not expired:
+            return
+        self._conn.executemany(
+            "DELETE FROM resolutions_fts WHERE rowid = ?", [(i,) for i in expired]
+        )
+        self._conn.executemany(
+            "DELETE FROM resolutions WHERE id = ?", [(i,) for i in expired]
+        )
+        self._counters["expired"] += len(expired)
+
+    # Add resolutions, each one is a dict with signature, title, url, source and resolution,
+    # the signature is the error text of the resolved item itself
+    def add_many(self, resolutions: list[dict]):
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            for item in resolutions:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO resolutions "
+                    "(url, source, title, resolution, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        item.get("url"),
+                        item["source"],
+                        item["title"],
+                        item.get("resolution") or "",
+                        now,
+                    ),
+                )
+                if cursor.rowcount == 0:
+                    continue
+                self._conn.execute(
+                    "INSERT INTO resolutions_fts (rowid, signature, title, resolution) "
+                    "VALUES (?, ?, ?, ?)",
+                    (
+                        cursor.lastrowid,
+                        normalize_error_message(item.get("signature") or item["title"]),
+                        item["title"],
+                        item.get("resolution") or "",
+                    ),
+                )
+                self._counters["indexed"] += 1
+            self._conn.commit()
+
+    # Best matches for an error, a match is a hit when the query and the signature share
+    # enough of their terms both ways and the signature has every key term of the query
+    def search(self, error: str, limit: int = 5):
+        self._counters["queries"] += 1
+        query_tokens = _tokens(error)
+        if not query_tokens:
+            return []
+        key_tokens = _key_tokens(error) & query_tokens
+        match = " OR ".join(f'"{token}"' for token in sorted(query_tokens))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.source, r.title, r.url, r.resolution, f.signature, "
+                "bm25(resolutions_fts) AS rank "
+                "FROM resolutions_fts f JOIN resolutions r ON r.id = f.rowid "
+                "WHERE resolutions_fts MATCH ? AND r.created_at >= ? "
+                "ORDER BY rank LIMIT ?",
+                (match, time.time() - self.ttl, limit),
+            ).fetchall()
+
+        results = []
+        for source, title, url, resolution, signature, rank in rows:
+            signature_tokens = set(signature.split())
+            # Dice coefficient, a long signature covering a short query is not a match
+            overlap = (
+                2
+                * len(query_tokens & signature_tokens)
+                / (len(query_tokens) + len(signature_tokens))
+            )
+            missing = sorted(key_tokens - signature_tokens)
+            results.append(
+                {
+                    "source": source,
+                    "title": title,
+                    "url": url,
+                    "resolution": resolution,
+                    "bm25": round(rank, 4),
+                    "overlap": round(overlap, 3),
+                    "missing_terms": missing,
+                    "hit": overlap >= self.min_overlap and not missing,
+                }
+            )
+        if any(result["hit"] for result in results):
+            self._counters["hits"] += 1
+        return results
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM resolutions").fetchone()[0]
+        return {
+            "entries": size,
+            "min_overlap": self.min_overlap,
+            "ttl": self.ttl,
+            **self._counters,
+        }
@@ -0,0 +1,112 @@
+import os
+import re
+from app.tools.stack_trace import parse_stack_trace
+
+# Reports below this confidence are left to the model
+MIN_CONFIDENCE = float(os.environ.get("TEXT_EXTRACTION_MIN_CONFIDENCE", 0.7))
+# Longest traceback kept in a report
+MAX_TRACEBACK_LINES = 40
+
+_QUOTED_RE = re.compile(r"""['"`]([^'"`\s]{1,80})['"`]""")
+_PY_FRAME_RE = re.compile(r'^\s*File\s*"[^"]+",\s*line \d+,\s*in\s*\S+')
+_PACKAGE_RE = re.compile(r"(?:site-packages|dist-packages|node_modules)[\\/]([\w.\-@]+)")
+_PYTHON_VERSION_RE = re.compile(r"python(\d\.\d+)")
+
+# Fast path counters, a hit is a report built without calling the model
+text_extraction_stats = {"calls": 0, "fast_path": 0, "fallback": 0}
+
+
+# Source line printed under the innermost python frame, or above a node error
+def _error_context(lines: list[str], language: str):
+    if language == "python":
+        for i in range(len(lines) - 1, -1, -1):
+            if _PY_FRAME_RE.match(lines[i]):
+                context = lines[i + 1 : i + 4]
+                return "\n".join(
+                    line.strip() for line in context if line.startswith("    ") and line.strip()
+                )
+    if language == "javascript" and len(lines) > 1 and re.match(r"^\S+:\d+$", lines[0]):
+        return lines[1].strip()
+    return ""
+
+
+def _environment(parsed: dict):
+    hints = []
+    for frame in parsed["frames"]:
+        file = frame["file"] or ""
+        hints += [f"package {name}" for name in _PACKAGE_RE.findall(file)]
+        hints += [f"python {version}" for version in _PYTHON_VERSION_RE.findall(file)]
+    return ", ".join(dict.fromkeys(hints))
+
+
+# How sure the parser is that it understood the error, the model is used below MIN_CONFIDENCE
+def _confidence(parsed: dict):
+    if not parsed["language"]:
+        return 0.0
+    confidence = 0.5
+    if parsed["frames"]:
+        confidence += 0.3
+    if parsed["message"]:
+        confidence += 0.2
+    return round(confidence, 2)
+
+
+# The error_tracer report fields for an error given as text, built without a model call
+def extract_error_fields(text: str):
+    lines = (text or "").strip().splitlines()
+    parsed = parse_stack_trace(text)
+    top = parsed["frames"][0] if parsed["frames"] else {}
+    # Rust reports the panic location as a frame without a function
+    function_frame = next(
+        (frame for frame in parsed["frames"] if frame["function"] != "<panic>"), top
+    )
+    severity = (
+        "Warning"
+        if parsed["exception_type"].endswith("Warning")
+        else "Critical (stops execution)"
+    )
+    fields = {
+        "Line No": top.get("line"),
+        "Type of Error": parsed["exception_type"],
+        "Error Message": parsed["message"],
+        "Error Context": _error_context(lines, parsed["language"]),
+        "Traceback Info": "\n".join(lines[:MAX_TRACEBACK_LINES]),
+        "Variables Involved": ", ".join(
+            dict.fromkeys(_QUOTED_RE.findall(parsed["message"]))
+        ),
+        "Module/Function": (
+            f"{function_frame['function']} in {function_frame['file']}" if top else ""
+        ),
+        "Error Severity": severity,
+        "Environment Info": _environment(parsed),
+        "Additional Notes": f"{parsed['language']} stack trace, fingerprint {parsed['fingerprint']}",
+    }
+    return fields, _confidence(parsed)
+
+
+# Same layout as the error_tracer model output so the agents can not tell them apart
+def format_error_report(fields: dict):
+    lines = []
+    for name, value in fields.items():
+        value = "Not available" if value in (None, "") else str(value)
+        if "\n" in value:
+            value = "\n" + "\n".join(f"      {line}" for line in value.splitlines())
+        lines.append(f"* {name}: {value}")
+    return "\n".join(lines)
+
+
+# Report for the text when the parser is confident enough, None when the model is needed
+def fast_error_report(text: str, min_confidence: float = None):
+    min_confidence = MIN_CONFIDENCE if min_confidence is None else min_confidence
+    text_extraction_stats["calls"] += 1
+    fields, confidence = extract_error_fields(text)
+    if confidence < min_confidence:
+        text_extraction_stats["fallback"] += 1
+        return None, confidence
+    text_extraction_stats["fast_path"] += 1
+    return format_error_report(fields), confidence
+
+
+def text_extraction_hit_rate():
+    calls = text_extraction_stats["calls"]
+    return round(text_extraction_stats["fast_path"] / calls, 3) if calls else None
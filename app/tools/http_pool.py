@@ -0,0 +1,107 @@
+import time
+import aiohttp
+import os
+
+
+# Shared aiohttp session with a pooled connector used by every tool on the mcp server
+class HttpClientPool:
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        keepalive_timeout: float = 30,
+        dns_cache_ttl: int = 300,
+        total_timeout: float = 30,
+        connect_timeout: float = 10,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(
+            total=total_timeout, connect=connect_timeout
+        )
+        self._session = None
+        self._started_at = None
+        self._counters = {
+            "requests": 0,
+            "request_errors": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+        }
+
+    # Build the pool from the environment so each deployment can tune it
+    @classmethod
+    def from_env(cls):
+        return cls(
+            limit=int(os.environ.get("HTTP_POOL_LIMIT", 100)),
+            limit_per_host=int(os.environ.get("HTTP_POOL_LIMIT_PER_HOST", 20)),
+            keepalive_timeout=float(os.environ.get("HTTP_KEEPALIVE_TIMEOUT", 30)),
+            dns_cache_ttl=int(os.environ.get("HTTP_DNS_CACHE_TTL", 300)),
+            total_timeout=float(os.environ.get("HTTP_TIMEOUT", 30)),
+            connect_timeout=float(os.environ.get("HTTP_CONNECT_TIMEOUT", 10)),
+        )
+
+    # Count connection reuse and dns cache behaviour through aiohttp tracing
+    def _trace_config(self):
+        def _count(name):
+            async def _on_event(session, ctx, params):
+                self._counters[name] += 1
+
+            return _on_event
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(_count("requests"))
+        trace_config.on_request_exception.append(_count("request_errors"))
+        trace_config.on_connection_create_end.append(_count("connections_created"))
+        trace_config.on_connection_reuseconn.append(_count("connections_reused"))
+        trace_config.on_dns_cache_hit.append(_count("dns_cache_hits"))
+        trace_config.on_dns_cache_miss.append(_count("dns_cache_misses"))
+        return trace_config
+
+    # Open the session, must be called from inside the running event loop
+    async def start(self):
+        return self.session()
+
+    # Get the shared session, creating it lazily if the server did not start it
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                trace_configs=[self._trace_config()],
+            )
+            self._started_at = time.time()
+        return self._session
+
+    # Close the session and release all pooled connections
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # Pool stats exposed for monitoring
+    def stats(self) -> dict:
+        running = self._session is not None and not self._session.closed
+        return {
+            "running": running,
+            "uptime_seconds": round(time.time() - self._started_at, 3)
+            if running
+            else 0,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+            "dns_cache_ttl": self.dns_cache_ttl,
+            "total_timeout": self.timeout.total,
+            "connect_timeout": self.timeout.connect,
+            **self._counters,
+        }
@@ -0,0 +1,54 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+
+# Cache of error_tracer results keyed on the screenshot content, only byte identical
+# screenshots match since two different tracebacks on the same terminal look alike to
+# any whole screen perceptual hash
+class ExtractionCache:
+    def __init__(self, max_entries: int = 64, ttl: float = 600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # sha256 -> (expires_at, result)
+        self._entries = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.environ.get("EXTRACTION_CACHE_SIZE", 64)),
+            ttl=float(os.environ.get("EXTRACTION_CACHE_TTL", 600)),
+        )
+
+    def _purge_expired(self, now: float):
+        for digest in [d for d, e in self._entries.items() if e[0] <= now]:
+            del self._entries[digest]
+
+    # Look up a previous result for the same screenshot
+    def get(self, image_bytes: bytes):
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        self._purge_expired(time.time())
+        entry = self._entries.get(digest)
+        if entry is not None:
+            self._entries.move_to_end(digest)
+            self._counters["hits"] += 1
+            return digest, entry[1]
+        self._counters["misses"] += 1
+        return digest, None
+
+    def set(self, digest: str, result):
+        self._entries[digest] = (time.time() + self.ttl, result)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            **self._counters,
+        }
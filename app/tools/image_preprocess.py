@@ -0,0 +1,105 @@
+import io
+import os
+
+try:
+    from PIL import Image, ImageChops, ImageOps
+except ImportError:  # Without pillow screenshots are uploaded untouched
+    Image = None
+
+MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+# Settings for shrinking screenshots before they are sent to the vision model
+class PreprocessConfig:
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_side: int = 1600,
+        crop: bool = True,
+        crop_padding: int = 16,
+        grayscale: bool = True,
+        image_format: str = "PNG",
+        quality: int = 85,
+    ):
+        self.enabled = enabled and Image is not None
+        self.max_side = max_side
+        self.crop = crop
+        self.crop_padding = crop_padding
+        self.grayscale = grayscale
+        self.image_format = image_format.upper()
+        self.quality = quality
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.environ.get("IMAGE_PREPROCESS", "true").lower() == "true",
+            max_side=int(os.environ.get("IMAGE_MAX_SIDE", 1600)),
+            crop=os.environ.get("IMAGE_CROP", "true").lower() == "true",
+            crop_padding=int(os.environ.get("IMAGE_CROP_PADDING", 16)),
+            grayscale=os.environ.get("IMAGE_GRAYSCALE", "true").lower() == "true",
+            image_format=os.environ.get("IMAGE_FORMAT", "PNG"),
+            quality=int(os.environ.get("IMAGE_QUALITY", 85)),
+        )
+
+
+# Crop away the uniform background around the text, the top left pixel is taken as background
+def crop_to_content(image, padding: int):
+    gray = image.convert("L")
+    background = Image.new("L", gray.size, gray.getpixel((0, 0)))
+    # Ignore tiny differences from compression noise and anti aliasing
+    diff = ImageChops.difference(gray, background).point(lambda p: 255 if p > 24 else 0)
+    bbox = diff.getbbox()
+    if bbox is None:
+        return image
+    left, top, right, bottom = bbox
+    return image.crop(
+        (
+            max(left - padding, 0),
+            max(top - padding, 0),
+            min(right + padding, image.width),
+            min(bottom + padding, image.height),
+        )
+    )
+
+
+# Crop, downscale and re-encode a screenshot, returns the new bytes, mime type and a size report
+def preprocess_image(image_bytes: bytes, config: PreprocessConfig):
+    report = {
+        "original_bytes": len(image_bytes),
+        "processed_bytes": len(image_bytes),
+        "bytes_saved": 0,
+    }
+    if not config.enabled:
+        return image_bytes, "image/png", report
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image.load()
+    except OSError:
+        return image_bytes, "image/png", report
+    report["original_size"] = image.size
+
+    if config.crop:
+        image = crop_to_content(image, config.crop_padding)
+    if max(image.size) > config.max_side:
+        image.thumbnail((config.max_side, config.max_side), Image.Resampling.LANCZOS)
+    if config.grayscale:
+        image = ImageOps.grayscale(image)
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    if config.image_format == "PNG":
+        image.save(buffer, format="PNG", optimize=True)
+    else:
+        image.save(buffer, format=config.image_format, quality=config.quality)
+    processed = buffer.getvalue()
+    report["processed_size"] = image.size
+
+    # Keep the original when re-encoding did not make it any smaller
+    if len(processed) >= len(image_bytes):
+        return image_bytes, "image/png", report
+
+    report["processed_bytes"] = len(processed)
+    report["bytes_saved"] = len(image_bytes) - len(processed)
+    return processed, MIME_TYPES.get(config.image_format, "image/png"), report
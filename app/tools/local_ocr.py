@@ -0,0 +1,207 @@
+import io
+import os
+import re
+import threading
+import time
+import unicodedata
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # Without pillow and numpy every screenshot goes to the vision model
+    Image = None
+
+
+# Ocr engines by name, each one turns a list of single line crops into their text and
+# recognition confidence between 0 and 1
+class RapidOcrEngine:
+    def __init__(self):
+        from rapidocr_onnxruntime import RapidOCR
+
+        self._ocr = RapidOCR()
+
+    # Only the recognition model runs, the lines are already found by the segmentation
+    def recognize(self, crops: list):
+        results, _ = self._ocr.text_rec(
+            [np.stack([np.asarray(crop)] * 3, axis=-1) for crop in crops]
+        )
+        return [(text, float(score)) for text, score in results]
+
+
+class TesseractEngine:
+    def __init__(self):
+        import pytesseract
+
+        pytesseract.get_tesseract_version()
+        self._pytesseract = pytesseract
+
+    def recognize(self, crops: list):
+        lines = []
+        for crop in crops:
+            data = self._pytesseract.image_to_data(
+                crop, config="--psm 7", output_type=self._pytesseract.Output.DICT
+            )
+            # Tesseract scores every word from 0 to 100, -1 marks the layout boxes
+            words = [
+                (word, float(conf))
+                for word, conf in zip(data["text"], data["conf"])
+                if word.strip() and float(conf) >= 0
+            ]
+            lines.append(
+                (
+                    " ".join(word for word, _ in words),
+                    sum(conf for _, conf in words) / len(words) / 100 if words else 0.0,
+                )
+            )
+        return lines
+
+
+OCR_ENGINES = {"rapidocr": RapidOcrEngine, "tesseract": TesseractEngine}
+
+# Misreads the recognizers make with high confidence: an O read as a zero at the start of
+# a name and a backtick read as a caret, traces never print either outside of hex numbers
+# and caret only marker lines
+_MISREAD_RE = re.compile(r"(?<![\w.])\d(?!x[0-9a-fA-F])[A-Za-z]{2,}|\w\^|\^\w")
+
+
+def register_ocr_engine(name: str, factory):
+    OCR_ENGINES[name] = factory
+
+
+# Rows of a terminal screenshot that hold text, as (top, bottom) pixel bands
+def _text_bands(ink, min_height: int = 4, max_gap: int = 2):
+    bands = []
+    start = None
+    gap = 0
+    for y, has_ink in enumerate(ink.any(axis=1)):
+        if has_ink:
+            if start is None:
+                start = y
+            gap = 0
+        elif start is not None:
+            gap += 1
+            # Dots and accents sit a pixel or two above the rest of the line
+            if gap > max_gap:
+                bands.append((start, y - gap + 1))
+                start = None
+    if start is not None:
+        bands.append((start, len(ink)))
+    return [(top, bottom) for top, bottom in bands if bottom - top >= min_height]
+
+
+# Split a screenshot into dark on light crops of its text lines with their left offset
+def segment_lines(image_bytes: bytes, threshold: int = 48, padding: int = 3):
+    gray = np.asarray(Image.open(io.BytesIO(image_bytes)).convert("L"), dtype=np.int16)
+    background = int(np.median(gray))
+    ink = np.abs(gray - background) > threshold
+    lines = []
+    for top, bottom in _text_bands(ink):
+        columns = np.flatnonzero(ink[top:bottom].any(axis=0))
+        left, right = int(columns[0]), int(columns[-1]) + 1
+        crop = gray[
+            max(top - padding, 0) : bottom + padding,
+            max(left - padding, 0) : right + padding,
+        ]
+        # Terminals are mostly dark, the recognizers expect dark text on a light background
+        if background < 128:
+            crop = 255 - crop
+        lines.append((left, Image.fromarray(crop.astype(np.uint8))))
+    return lines
+
+
+# Rebuild the indentation from the left offsets, the trace parsers rely on it
+def _indent(lines: list, texts: list[str]):
+    widths = [
+        crop.width / len(text) for (_, crop), text in zip(lines, texts) if len(text) > 4
+    ]
+    if not widths:
+        return texts
+    char_width = sorted(widths)[len(widths) // 2]
+    margin = min(left for left, _ in lines)
+    return [
+        " " * round((left - margin) / char_width) + text
+        for (left, _), text in zip(lines, texts)
+    ]
+
+
+# Cpu only text extraction for terminal screenshots, its text goes to the traceback parser
+class LocalOcr:
+    def __init__(
+        self,
+        enabled: bool = True,
+        engine: str = "rapidocr",
+        max_lines: int = 80,
+        min_confidence: float = 0.85,
+    ):
+        self.enabled = enabled and Image is not None
+        self.engine_name = engine
+        self.max_lines = max_lines
+        self.min_confidence = min_confidence
+        self._engine = None
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "errors": 0,
+            "lines": 0,
+            "misread_lines": 0,
+            "total_ms": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.environ.get("LOCAL_OCR", "true").lower() == "true",
+            engine=os.environ.get("LOCAL_OCR_ENGINE", "rapidocr"),
+            max_lines=int(os.environ.get("LOCAL_OCR_MAX_LINES", 80)),
+            min_confidence=float(os.environ.get("LOCAL_OCR_MIN_CONFIDENCE", 0.85)),
+        )
+
+    # The engine loads its models on first use, a missing engine turns the ocr off
+    def _get_engine(self):
+        with self._lock:
+            if self._engine is None and self.enabled:
+                try:
+                    self._engine = OCR_ENGINES[self.engine_name]()
+                except Exception:
+                    self.enabled = False
+            return self._engine
+
+    # Text of the screenshot and the recognition confidence of its least certain line,
+    # (None, 0.0) when the ocr is off or failed
+    def extract_text(self, image_bytes: bytes):
+        engine = self._get_engine()
+        if engine is None:
+            return None, 0.0
+        start = time.perf_counter()
+        self._counters["calls"] += 1
+        try:
+            # Errors are printed last, so the bottom of a long terminal is what matters
+            lines = segment_lines(image_bytes)[-self.max_lines :]
+            recognized = engine.recognize([crop for _, crop in lines]) if lines else []
+        except Exception:
+            self._counters["errors"] += 1
+            return None, 0.0
+        finally:
+            self._counters["total_ms"] += (time.perf_counter() - start) * 1000
+        self._counters["lines"] += len(recognized)
+        texts = [unicodedata.normalize("NFKC", text) for text, _ in recognized]
+        # A line with a known misread counts as unreadable whatever the engine scored it
+        misread = [bool(_MISREAD_RE.search(text)) for text in texts]
+        self._counters["misread_lines"] += sum(misread)
+        scores = [0.0 if bad else conf for bad, (_, conf) in zip(misread, recognized)]
+        # One garbled line is enough to mislead the parser, so the weakest line counts
+        confidence = min(
+            (score for text, score in zip(texts, scores) if text.strip()),
+            default=0.0,
+        )
+        return "\n".join(_indent(lines, texts)), confidence
+
+    def stats(self) -> dict:
+        calls = self._counters["calls"]
+        return {
+            "enabled": self.enabled,
+            "engine": self.engine_name,
+            "min_confidence": self.min_confidence,
+            **self._counters,
+            "avg_ms": round(self._counters["total_ms"] / calls, 1) if calls else None,
+        }
@@ -0,0 +1,116 @@
+import html
+import json
+import os
+import re
+
+# Longest body or answer excerpt kept in the compact results
+EXCERPT_CHARS = int(os.environ.get("RESULT_EXCERPT_CHARS", 500))
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+# Payload size before and after the projection per source
+projection_stats = {}
+
+
+def excerpt(text: str, max_chars: int = EXCERPT_CHARS):
+    if not text:
+        return ""
+    text = _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub(" ", text))).strip()
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + "..."
+
+
+def _record(source: str, raw, projected):
+    stats = projection_stats.setdefault(
+        source, {"calls": 0, "raw_bytes": 0, "projected_bytes": 0, "bytes_saved": 0}
+    )
+    raw_bytes = len(json.dumps(raw, default=str))
+    projected_bytes = len(json.dumps(projected, default=str))
+    stats["calls"] += 1
+    stats["raw_bytes"] += raw_bytes
+    stats["projected_bytes"] += projected_bytes
+    stats["bytes_saved"] += raw_bytes - projected_bytes
+    return projected
+
+
+# Compact github issue search results
+def project_github(data: dict):
+    if "items" not in data:
+        return data
+    projected = {
+        "total_count": data.get("total_count"),
+        "items": [
+            {
+                "title": item.get("title"),
+                "url": item.get("html_url"),
+                "state": item.get("state"),
+                "score": item.get("score"),
+                "comments": item.get("comments"),
+                "created_at": item.get("created_at"),
+                "labels": [label.get("name") for label in item.get("labels", [])],
+                "body": excerpt(item.get("body")),
+            }
+            for item in data["items"]
+        ],
+    }
+    return _record("github", data, projected)
+
+
+# Compact reddit search results, the children carry dozens of unused fields
+def project_reddit(children: list):
+    projected = []
+    for child in children:
+        post = child.get("data", {})
+        projected.append(
+            {
+                "title": post.get("title"),
+                "url": f"https://www.reddit.com{post.get('permalink', '')}",
+                "subreddit": post.get("subreddit"),
+                "score": post.get("score"),
+                "num_comments": post.get("num_comments"),
+                "created_utc": post.get("created_utc"),
+                "body": excerpt(post.get("selftext")),
+            }
+        )
+    return _record("reddit", children, projected)
+
+
+def _top_answer(item: dict):
+    answers = item.get("answers") or []
+    if not answers:
+        return None
+    accepted = [answer for answer in answers if answer.get("is_accepted")]
+    answer = accepted[0] if accepted else max(answers, key=lambda a: a.get("score", 0))
+    return {
+        "score": answer.get("score"),
+        "is_accepted": answer.get("is_accepted", False),
+        "body": excerpt(answer.get("body")),
+    }
+
+
+# Compact stack overflow questions with the accepted or best answer
+def project_stackoverflow(items: list):
+    projected = []
+    for item in items:
+        # The text response format is already a list of plain strings
+        if not isinstance(item, dict):
+            return items
+        question = {
+            "title": html.unescape(item.get("title", "")),
+            "url": item.get("link"),
+            "score": item.get("score"),
+            "is_answered": item.get("is_answered"),
+            "answer_count": item.get("answer_count"),
+            "tags": item.get("tags", []),
+            "body": excerpt(item.get("body")),
+            "top_answer": _top_answer(item),
+        }
+        if "comments" in item:
+            question["comments"] = [
+                {"score": comment.get("score"), "body": excerpt(comment.get("body"))}
+                for comment in item["comments"][:5]
+            ]
+        projected.append(question)
+    return _record("stackoverflow", items, projected)
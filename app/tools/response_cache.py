@@ -0,0 +1,277 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from app.tools.single_flight import SingleFlight
+
+
+# Normalize the tool arguments so equivalent calls share the same cache key
+def normalize_args(args: dict):
+    normalized = {}
+    for name, value in sorted(args.items()):
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.split()).lower()
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted(
+                " ".join(v.split()).lower() if isinstance(v, str) else v
+                for v in value
+            )
+        normalized[name] = value
+    return normalized
+
+
+def make_key(source: str, args: dict):
+    return f"{source}:{json.dumps(normalize_args(args), sort_keys=True)}"
+
+
+# Sqlite backed tier so cached responses survive mcp server restarts, bounded like the
+# memory tier, the entries closest to expiring are dropped first
+class SqliteCacheStore:
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        purge_interval: float = 60,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._counters = {"disk_evictions": 0, "disk_expirations": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = [
+                row[1]
+                for row in self._conn.execute("PRAGMA table_info(response_cache)")
+            ]
+            if "size" not in columns:
+                # Stores written before the size bound
+                self._conn.execute(
+                    "ALTER TABLE response_cache "
+                    "ADD COLUMN size INTEGER NOT NULL DEFAULT 0"
+                )
+                self._conn.execute("UPDATE response_cache SET size = length(value)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS response_cache_expires "
+                "ON response_cache (expires_at)"
+            )
+            self._purge_expired()
+            self._enforce_limits()
+            self._conn.commit()
+
+    def _purge_expired(self):
+        deleted = self._conn.execute(
+            "DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),)
+        ).rowcount
+        self._counters["disk_expirations"] += deleted
+        self._last_purge = time.time()
+
+    def _enforce_limits(self):
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM response_cache ORDER BY expires_at"
+        ):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM response_cache WHERE key = ?", evicted)
+        self._counters["disk_evictions"] += len(evicted)
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, value FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return row
+
+    def set(self, key: str, expires_at: float, value: str):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, expires_at, value, size) "
+                "VALUES (?, ?, ?, ?)",
+                (key, expires_at, value, size),
+            )
+            if time.time() - self._last_purge >= self.purge_interval:
+                self._purge_expired()
+            self._enforce_limits()
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+            ).fetchone()
+        return {
+            "disk_entries": count,
+            "disk_bytes": total,
+            "disk_max_entries": self.max_entries,
+            "disk_max_bytes": self.max_bytes,
+            **self._counters,
+        }
+
+
+# In memory TTL + LRU cache bounded by entry count and byte size
+class ResponseCache:
+    def __init__(
+        self,
+        ttls: dict,
+        default_ttl: float = 600,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        store: SqliteCacheStore = None,
+        single_flight: SingleFlight = None,
+    ):
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.store = store
+        self.single_flight = single_flight
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    # Build the cache from the environment, the disk tier is enabled by CACHE_DB_PATH
+    @classmethod
+    def from_env(cls, single_flight: SingleFlight = None):
+        db_path = os.environ.get("CACHE_DB_PATH")
+        return cls(
+            ttls={
+                "github": float(os.environ.get("CACHE_TTL_GITHUB", 900)),
+                "reddit": float(os.environ.get("CACHE_TTL_REDDIT", 600)),
+                "stackoverflow": float(os.environ.get("CACHE_TTL_STACKOVERFLOW", 3600)),
+            },
+            default_ttl=float(os.environ.get("CACHE_TTL_DEFAULT", 600)),
+            max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", 1024)),
+            max_bytes=int(os.environ.get("CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+            store=SqliteCacheStore(
+                db_path,
+                max_entries=int(os.environ.get("CACHE_DB_MAX_ENTRIES", 10000)),
+                max_bytes=int(os.environ.get("CACHE_DB_MAX_BYTES", 256 * 1024 * 1024)),
+                purge_interval=float(os.environ.get("CACHE_DB_PURGE_INTERVAL", 60)),
+            )
+            if db_path
+            else None,
+            single_flight=single_flight,
+        )
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _put(self, key: str, expires_at: float, value: str):
+        if key in self._entries:
+            self._remove(key)
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (expires_at, value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self._counters["evictions"] += 1
+
+    # Get a cached response, the value is decoded on every hit so callers can mutate it
+    async def get(self, source: str, args: dict):
+        key = make_key(source, args)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return True, json.loads(entry[1])
+            self._remove(key)
+            self._counters["expirations"] += 1
+
+        if self.store is not None:
+            row = await asyncio.to_thread(self.store.get, key)
+            if row is not None:
+                if row[0] > now:
+                    self._put(key, row[0], row[1])
+                    self._counters["disk_hits"] += 1
+                    return True, json.loads(row[1])
+                await asyncio.to_thread(self.store.delete, key)
+                self._counters["expirations"] += 1
+
+        self._counters["misses"] += 1
+        return False, None
+
+    async def set(self, source: str, args: dict, value):
+        key = make_key(source, args)
+        expires_at = time.time() + self.ttls.get(source, self.default_ttl)
+        encoded = json.dumps(value)
+        self._put(key, expires_at, encoded)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, key, expires_at, encoded)
+
+    # Serve from the cache or fetch and cache the fresh response, identical misses
+    # in flight at the same time share one fetch when single flight is enabled
+    async def get_or_fetch(self, source: str, args: dict, fetch, cacheable=None):
+        hit, value = await self.get(source, args)
+        if hit:
+            return value
+
+        async def _fetch_and_store():
+            value = await fetch()
+            if cacheable is None or cacheable(value):
+                await self.set(source, args, value)
+            return value
+
+        if self.single_flight is None:
+            return await _fetch_and_store()
+        return await self.single_flight.do(make_key(source, args), _fetch_and_store)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttls": self.ttls,
+            "persistent": self.store is not None,
+            **self._counters,
+            **(self.store.stats() if self.store is not None else {}),
+        }
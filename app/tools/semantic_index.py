@@ -0,0 +1,464 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+import numpy as np
+from app.tools.error_index import normalize_error_message
+
+_WORD_RE = re.compile(r"[a-z_][a-z0-9_]+")
+
+
+# Local cpu embedder, hashes words, word pairs and character trigrams of the
+# normalized error signature into a fixed size unit vector. It matches words and not
+# meaning, so its neighbours are only candidates and never a hit
+class HashingEmbedder:
+    semantic = False
+
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+
+    def _features(self, text: str):
+        words = _WORD_RE.findall(normalize_error_message(text))
+        features = [f"w:{word}" for word in words]
+        features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f" {word} "
+            features += [f"c:{padded[i : i + 3]}" for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self.dim] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+
+# Embedders by name, a sentence transformer or remote embedder only needs to register here,
+# one whose vectors capture meaning sets semantic = True so its close matches count as hits
+EMBEDDERS = {"hashing": HashingEmbedder}
+
+
+def register_embedder(name: str, factory):
+    EMBEDDERS[name] = factory
+
+
+# Cosine top-k over unit vectors kept in a memory mapped numpy file. Small indexes are
+# searched exactly, larger ones through an inverted file of k-means lists so a query
+# only scans the few lists closest to it.
+class VectorIndex:
+    def __init__(
+        self,
+        directory: str = None,
+        dim: int = 128,
+        exact_threshold: int = 50000,
+        n_lists: int = 256,
+        n_probe: int = 16,
+    ):
+        self.directory = directory
+        self.dim = dim
+        self.exact_threshold = exact_threshold
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self._lock = threading.RLock()
+        self._centroids = None
+        self._lists = None
+        self._built_count = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(
+                os.path.join(directory, "items.db"), check_same_thread=False
+            )
+        else:
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS items (row INTEGER PRIMARY KEY, url TEXT UNIQUE, "
+            "source TEXT, title TEXT, resolution TEXT, list_id INTEGER, "
+            "created_at REAL NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(items)")]
+        if "created_at" not in columns:
+            # Items written before the ttl count as expired
+            self._conn.execute(
+                "ALTER TABLE items ADD COLUMN created_at REAL NOT NULL DEFAULT 0"
+            )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        self._vectors = self._open_vectors(max(self._count, 1024))
+        self._load_lists()
+
+    def _vectors_path(self):
+        return os.path.join(self.directory, "vectors.npy")
+
+    def _open_vectors(self, capacity: int):
+        if not self.directory:
+            return np.zeros((capacity, self.dim), dtype=np.float32)
+        path = self._vectors_path()
+        if os.path.exists(path):
+            return np.load(path, mmap_mode="r+")
+        return np.lib.format.open_memmap(
+            path, mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+        )
+
+    # Double the vector storage, the memory map is rewritten into a larger file
+    def _grow(self, needed: int):
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        capacity = max(capacity * 2, needed)
+        if not self.directory:
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[: self._count] = self._vectors[: self._count]
+            self._vectors = grown
+            return
+        path = self._vectors_path()
+        tmp_path = f"{path}.tmp"
+        grown = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+        )
+        grown[: self._count] = self._vectors[: self._count]
+        grown.flush()
+        del grown
+        self._vectors = None
+        os.replace(tmp_path, path)
+        self._vectors = np.load(path, mmap_mode="r+")
+
+    def _centroids_path(self):
+        return os.path.join(self.directory, "centroids.npy")
+
+    def _load_lists(self):
+        if not self.directory or not os.path.exists(self._centroids_path()):
+            return
+        self._centroids = np.load(self._centroids_path())
+        rows = np.array(
+            self._conn.execute(
+                "SELECT row, list_id FROM items WHERE list_id IS NOT NULL"
+            ).fetchall(),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        self._set_lists(rows[:, 0], rows[:, 1])
+        self._built_count = self._count
+
+    def _set_lists(self, rows: np.ndarray, list_ids: np.ndarray):
+        order = np.argsort(list_ids, kind="stable")
+        bounds = np.searchsorted(list_ids[order], np.arange(len(self._centroids) + 1))
+        self._lists = [
+            list(rows[order[bounds[i] : bounds[i + 1]]])
+            for i in range(len(self._centroids))
+        ]
+        self._list_arrays = {}
+
+    # Spherical k-means over a sample of the vectors, then every vector is assigned a list
+    def build_lists(self, iterations: int = 10, sample_size: int = 100000, seed: int = 0):
+        with self._lock:
+            count = self._count
+            n_lists = min(self.n_lists, count)
+            rng = np.random.default_rng(seed)
+            sample = self._vectors[
+                np.sort(rng.choice(count, size=min(sample_size, count), replace=False))
+            ]
+            centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)]
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                empty = norms[:, 0] == 0
+                sums[empty] = centroids[empty]
+                norms[empty] = 1
+                centroids = (sums / norms).astype(np.float32)
+
+            self._centroids = centroids
+            list_ids = self._assign(0, count)
+            rows = np.arange(count)
+            self._set_lists(rows, list_ids)
+            self._built_count = count
+            if self.directory:
+                np.save(self._centroids_path(), centroids)
+                self._conn.executemany(
+                    "UPDATE items SET list_id = ? WHERE row = ?",
+                    zip(list_ids.tolist(), rows.tolist()),
+                )
+                self._conn.commit()
+
+    def _assign(self, start: int, stop: int, chunk: int = 65536):
+        list_ids = np.empty(stop - start, dtype=np.int64)
+        for offset in range(start, stop, chunk):
+            end = min(offset + chunk, stop)
+            scores = self._vectors[offset:end] @ self._centroids.T
+            list_ids[offset - start : end - start] = np.argmax(scores, axis=1)
+        return list_ids
+
+    # Add vectors with their records, records with a url already in the index are skipped
+    # unless the indexed one was created before expired_before, then it is replaced in place
+    def add(self, vectors: np.ndarray, records: list[dict], expired_before: float = 0):
+        now = time.time()
+        with self._lock:
+            new_rows = []
+            for vector, record in zip(vectors, records):
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO items "
+                    "(row, url, source, title, resolution, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        self._count + len(new_rows),
+                        record.get("url"),
+                        record.get("source"),
+                        record.get("title"),
+                        record.get("resolution"),
+                        now,
+                    ),
+                )
+                if cursor.rowcount:
+                    new_rows.append(vector)
+                    continue
+                expired = self._conn.execute(
+                    "SELECT row FROM items WHERE url = ? AND created_at < ?",
+                    (record.get("url"), expired_before),
+                ).fetchone()
+                if expired is None:
+                    continue
+                self._conn.execute(
+                    "UPDATE items SET source = ?, title = ?, resolution = ?, "
+                    "created_at = ? WHERE row = ?",
+                    (
+                        record.get("source"),
+                        record.get("title"),
+                        record.get("resolution"),
+                        now,
+                        expired[0],
+                    ),
+                )
+                # The row keeps its list, a close enough vector for the same url
+                self._vectors[expired[0]] = vector
+            if not new_rows:
+                self._conn.commit()
+                return 0
+
+            start = self._count
+            self._grow(start + len(new_rows))
+            self._vectors[start : start + len(new_rows)] = np.asarray(
+                new_rows, dtype=np.float32
+            )
+            self._count = start + len(new_rows)
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+
+            if self._centroids is not None:
+                list_ids = self._assign(start, self._count)
+                for row, list_id in zip(range(start, self._count), list_ids.tolist()):
+                    self._lists[list_id].append(row)
+                    self._list_arrays.pop(list_id, None)
+                self._conn.executemany(
+                    "UPDATE items SET list_id = ? WHERE row = ?",
+                    zip(list_ids.tolist(), range(start, self._count)),
+                )
+            self._conn.commit()
+
+        # Partition once the index outgrows exact search and again after it grew 4x
+        if self._count >= self.exact_threshold and (
+            self._centroids is None or self._count >= self._built_count * 4
+        ):
+            self.build_lists()
+        return len(new_rows)
+
+    def _list_rows(self, list_id: int):
+        rows = self._list_arrays.get(list_id)
+        if rows is None:
+            rows = np.asarray(self._lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = rows
+        return rows
+
+    def _top_k(self, scores: np.ndarray, rows: np.ndarray, k: int):
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    # Batched cosine top-k, returns (row, score) pairs per query
+    def search_vectors(self, queries: np.ndarray, k: int = 5):
+        with self._lock:
+            if self._count == 0:
+                return [[] for _ in queries]
+            if self._centroids is None:
+                scores = self._vectors[: self._count] @ queries.T
+                rows = np.arange(self._count)
+                return [self._top_k(scores[:, i], rows, k) for i in range(len(queries))]
+
+            results = []
+            probes = np.argsort(-(queries @ self._centroids.T), axis=1)[:, : self.n_probe]
+            for query, lists in zip(queries, probes):
+                # Sorted rows keep the reads from the memory map sequential
+                rows = np.sort(np.concatenate([self._list_rows(int(i)) for i in lists]))
+                scores = self._vectors[rows] @ query
+                results.append(self._top_k(scores, rows, k))
+            return results
+
+    # Drop the rows created before the given time, the remaining rows move up to close the
+    # gaps so expired vectors stop taking top-k slots
+    def purge(self, before: float, chunk: int = 65536):
+        with self._lock:
+            keep = np.array(
+                self._conn.execute(
+                    "SELECT row FROM items WHERE created_at >= ? ORDER BY row", (before,)
+                ).fetchall(),
+                dtype=np.int64,
+            ).reshape(-1)
+            removed = self._count - len(keep)
+            if removed == 0:
+                return 0
+            self._conn.execute("DELETE FROM items WHERE created_at < ?", (before,))
+            # Through negative numbers so the new row numbers never collide with old ones
+            self._conn.executemany(
+                "UPDATE items SET row = ? WHERE row = ?",
+                [(-new - 1, old) for new, old in enumerate(keep.tolist())],
+            )
+            self._conn.execute("UPDATE items SET row = -row - 1")
+            # Every row only moves down, so copying in order never reads a moved row
+            for start in range(0, len(keep), chunk):
+                end = min(start + chunk, len(keep))
+                self._vectors[start:end] = self._vectors[keep[start:end]]
+            self._count = len(keep)
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            if self._centroids is not None:
+                list_ids = self._assign(0, self._count)
+                self._set_lists(np.arange(self._count), list_ids)
+                self._conn.executemany(
+                    "UPDATE items SET list_id = ? WHERE row = ?",
+                    zip(list_ids.tolist(), range(self._count)),
+                )
+            self._conn.commit()
+            return removed
+
+    # Records of the rows created at or after since, older rows are left out
+    def records(self, rows: list[int], since: float = 0):
+        if not rows:
+            return {}
+        placeholders = ",".join("?" for _ in rows)
+        with self._lock:
+            found = self._conn.execute(
+                f"SELECT row, url, source, title, resolution FROM items "
+                f"WHERE row IN ({placeholders}) AND created_at >= ?",
+                [*rows, since],
+            ).fetchall()
+        return {
+            row: {"url": url, "source": source, "title": title, "resolution": resolution}
+            for row, url, source, title, resolution in found
+        }
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Semantic retrieval of previous resolutions by their error signature
+class SemanticIndex:
+    def __init__(
+        self,
+        embedder,
+        index: VectorIndex,
+        min_score: float = 0.6,
+        ttl: float = 2592000,
+        purge_interval: float = 3600,
+    ):
+        self.embedder = embedder
+        self.index = index
+        self.min_score = min_score
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._counters = {"indexed": 0, "queries": 0, "hits": 0, "expired": 0}
+
+    @classmethod
+    def from_env(cls):
+        dim = int(os.environ.get("SEMANTIC_INDEX_DIM", 128))
+        embedder = EMBEDDERS[os.environ.get("SEMANTIC_EMBEDDER", "hashing")](dim=dim)
+        index = VectorIndex(
+            directory=os.environ.get("SEMANTIC_INDEX_DIR", "semantic_index") or None,
+            dim=dim,
+            n_lists=int(os.environ.get("SEMANTIC_INDEX_LISTS", 256)),
+            n_probe=int(os.environ.get("SEMANTIC_INDEX_PROBES", 16)),
+        )
+        return cls(
+            embedder,
+            index,
+            min_score=float(os.environ.get("SEMANTIC_MIN_SCORE", 0.6)),
+            ttl=float(os.environ.get("SEMANTIC_INDEX_TTL", 2592000)),
+            purge_interval=float(os.environ.get("SEMANTIC_INDEX_PURGE_INTERVAL", 3600)),
+        )
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        self._counters["expired"] += self.index.purge(now - self.ttl)
+
+    # Add resolutions, each one is a dict with signature, title, url, source and resolution,
+    # the signature is the error text of the resolved item itself
+    def add_many(self, resolutions: list[dict]):
+        self._purge_expired()
+        signatures = [item.get("signature") or item["title"] for item in resolutions]
+        added = self.index.add(
+            self.embedder.embed(signatures),
+            resolutions,
+            expired_before=time.time() - self.ttl,
+        )
+        self._counters["indexed"] += added
+        return added
+
+    # Nearest previous resolutions, only an embedder that captures meaning can report a hit
+    def search_many(self, errors: list[str], limit: int = 5):
+        self._counters["queries"] += len(errors)
+        self._purge_expired()
+        # Rows that expired since the last purge are dropped below, the extra ones fill in
+        matches = self.index.search_vectors(self.embedder.embed(errors), k=limit * 2)
+        records = self.index.records(
+            [row for match in matches for row, _ in match], since=time.time() - self.ttl
+        )
+        semantic = getattr(self.embedder, "semantic", False)
+        results = []
+        for match in matches:
+            found = [
+                {
+                    **records[row],
+                    "similarity": round(score, 4),
+                    "hit": semantic and score >= self.min_score,
+                }
+                for row, score in match
+                if row in records
+            ][:limit]
+            if any(result["hit"] for result in found):
+                self._counters["hits"] += 1
+            results.append(found)
+        return results
+
+    def search(self, error: str, limit: int = 5):
+        return self.search_many([error], limit)[0]
+
+    def close(self):
+        self.index.close()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.index),
+            "dim": self.index.dim,
+            "partitioned": self.index._centroids is not None,
+            "min_score": self.min_score,
+            "semantic": getattr(self.embedder, "semantic", False),
+            "ttl": self.ttl,
+            **self._counters,
+        }
@@ -0,0 +1,29 @@
+import asyncio
+
+
+# Coalesce concurrent calls with the same key into one shared upstream future
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+        self._counters = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    # Run fetch once per key, later callers await the same result while it is in flight
+    async def do(self, key: str, fetch):
+        self._counters["calls"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self._counters["executions"] += 1
+        else:
+            self._counters["coalesced"] += 1
+        # Shield so a cancelled caller does not cancel the call shared with the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), **self._counters}
@@ -0,0 +1,234 @@
+import hashlib
+import os
+import re
+from app.tools.error_index import normalize_error_message
+
+# Frames kept from the top of the stack, they are part of the fingerprint too
+TOP_FRAMES = 3
+# Words of the normalized message kept in the search query
+QUERY_WORDS = 8
+
+# Python
+_PY_FRAME_RE = re.compile(r'^\s*File\s*"(?P<file>[^"]+)",\s*line (?P<line>\d+),\s*in\s*(?P<function>\S+)')
+_PY_ERROR_RE = re.compile(r"^(?P<type>[A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|Warning|Iteration))(?::\s*(?P<message>.*))?$")
+# Any other exception class, like django's ImproperlyConfigured, once the frames were printed
+_PY_RAISED_RE = re.compile(r"^(?P<type>[A-Za-z_][\w.]*):\s*(?P<message>.*)$")
+_PY_HEADER = "Traceback (most recent call last)"
+# Java, the exception line may be prefixed by the thread or a "Caused by"
+_JAVA_FRAME_RE = re.compile(r"^\s*at (?P<function>[\w$.<>]+)\((?P<file>[^:)]+)(?::(?P<line>\d+))?\)")
+_JAVA_ERROR_RE = re.compile(r'^(?:Exception in thread "[^"]*"\s*|Caused by:\s*)?(?P<type>(?:[a-zA-Z_$][\w$]*\.)+[A-Z][\w$]*(?:Exception|Error|Throwable))(?::\s*(?P<message>.*))?$')
+# Javascript and node
+_JS_FRAME_RE = re.compile(r"^\s*at (?:(?P<function>.+?) \()?(?P<file>[^()\s]+?):(?P<line>\d+):\d+\)?$")
+_JS_ERROR_RE = re.compile(r"^(?:Uncaught )?(?P<type>[A-Z]\w*(?:Error|Exception))(?: \[[A-Z_]+\])?:\s*(?P<message>.*)$")
+# Go
+_GO_PANIC_RE = re.compile(r"^panic:\s*(?P<message>.*?)(?: \[recovered\])?$")
+_GO_FUNCTION_RE = re.compile(r"^(?P<function>[\w./*()\-]+)\(.*\)$")
+_GO_FILE_RE = re.compile(r"^\s+(?P<file>\S+\.go):(?P<line>\d+)")
+# Rust, the message follows the location since 1.73 and precedes it before
+_RUST_PANIC_RE = re.compile(r"^thread '(?P<thread>[^']*)' panicked at (?:'(?P<old_message>.*)', )?(?P<file>[^:\s]+):(?P<line>\d+):\d+:?$")
+_RUST_FRAME_RE = re.compile(r"^\s*\d+:\s*(?P<function>\S+)")
+_RUST_LOCATION_RE = re.compile(r"^\s*at (?P<file>\S+?):(?P<line>\d+)")
+# Frames of the language runtime say nothing about the error itself
+_RUST_RUNTIME = ("std::", "core::", "rust_begin_unwind", "__rust", "<alloc::", "alloc::")
+
+
+def _frame(file: str, line, function: str):
+    return {"file": file, "line": int(line) if line else None, "function": function}
+
+
+def _parse_python(lines: list[str]):
+    if not any(line.startswith(_PY_HEADER) for line in lines):
+        return None
+    frames = []
+    error = None
+    for line in lines:
+        frame = _PY_FRAME_RE.match(line)
+        if frame:
+            frames.append(_frame(frame["file"], frame["line"], frame["function"]))
+            continue
+        if line.startswith(" "):
+            continue
+        match = _PY_ERROR_RE.match(line.strip()) or (
+            frames and _PY_RAISED_RE.match(line.strip())
+        )
+        # With chained exceptions the last one raised is the one the user sees
+        if match:
+            error = match
+    if error is None:
+        return None
+    return {
+        "language": "python",
+        "exception_type": error["type"],
+        "message": (error["message"] or "").strip(),
+        # Python prints the innermost frame last
+        "frames": frames[::-1],
+    }
+
+
+def _parse_java(lines: list[str]):
+    errors = []
+    frames_by_error = []
+    for line in lines:
+        frame = _JAVA_FRAME_RE.match(line)
+        if frame and errors:
+            frames_by_error[-1].append(
+                _frame(frame["file"], frame["line"], frame["function"])
+            )
+            continue
+        match = _JAVA_ERROR_RE.match(line.strip())
+        if match:
+            errors.append(match)
+            frames_by_error.append([])
+    if not errors or not any(frames_by_error):
+        return None
+    # The last "Caused by" is the root cause
+    return {
+        "language": "java",
+        "exception_type": errors[-1]["type"],
+        "message": (errors[-1]["message"] or "").strip(),
+        "frames": frames_by_error[-1] or frames_by_error[0],
+    }
+
+
+def _parse_javascript(lines: list[str]):
+    error = None
+    frames = []
+    for line in lines:
+        frame = _JS_FRAME_RE.match(line)
+        if frame and error:
+            frames.append(
+                _frame(frame["file"], frame["line"], frame["function"] or "<anonymous>")
+            )
+            continue
+        if error is None:
+            error = _JS_ERROR_RE.match(line.strip())
+    if error is None or not frames:
+        return None
+    return {
+        "language": "javascript",
+        "exception_type": error["type"],
+        "message": error["message"].strip(),
+        "frames": frames,
+    }
+
+
+def _parse_go(lines: list[str]):
+    panic = None
+    frames = []
+    function = None
+    for line in lines:
+        if panic is None:
+            panic = _GO_PANIC_RE.match(line.strip())
+            continue
+        location = _GO_FILE_RE.match(line)
+        if location and function:
+            frames.append(_frame(location["file"], location["line"], function))
+            function = None
+            continue
+        match = _GO_FUNCTION_RE.match(line.strip())
+        function = match["function"] if match else None
+    if panic is None:
+        return None
+    message = panic["message"]
+    exception_type = "panic"
+    if message.startswith("runtime error:"):
+        exception_type, message = "runtime error", message[len("runtime error:") :]
+    # Frames of the go runtime itself sit above the code that panicked
+    user_frames = [
+        f for f in frames if f["function"] != "panic" and not f["function"].startswith("runtime.")
+    ]
+    return {
+        "language": "go",
+        "exception_type": exception_type,
+        "message": message.strip(),
+        "frames": user_frames or frames,
+    }
+
+
+def _parse_rust(lines: list[str]):
+    for i, line in enumerate(lines):
+        panic = _RUST_PANIC_RE.match(line.strip())
+        if panic:
+            break
+    else:
+        return None
+    message = panic["old_message"]
+    if message is None:
+        message = lines[i + 1].strip() if i + 1 < len(lines) else ""
+    frames = [_frame(panic["file"], panic["line"], "<panic>")]
+    function = None
+    for line in lines[i + 1 :]:
+        frame = _RUST_FRAME_RE.match(line)
+        if frame:
+            function = frame["function"]
+            continue
+        location = _RUST_LOCATION_RE.match(line)
+        if location and function and not function.startswith(_RUST_RUNTIME):
+            frames.append(_frame(location["file"], location["line"], function))
+            function = None
+    return {
+        "language": "rust",
+        "exception_type": "panic",
+        "message": message,
+        "frames": frames,
+    }
+
+
+# Parsers tried in order, the ones with the most specific markers go first
+TRACE_PARSERS = [_parse_python, _parse_rust, _parse_go, _parse_java, _parse_javascript]
+
+
+# Stable id of an error, the same error from another machine, path or line gets the same one.
+# Frames are compared case and space insensitive so ocr text of a screenshot matches too
+def fingerprint(parsed: dict):
+    frames = [
+        f"{os.path.basename(frame['file'] or '')}:{frame['function']}".lower().replace(" ", "")
+        for frame in parsed["frames"][:TOP_FRAMES]
+    ]
+    signature = "|".join(
+        [
+            parsed["language"],
+            parsed["exception_type"],
+            normalize_error_message(parsed["message"]),
+            *frames,
+        ]
+    )
+    return hashlib.sha1(signature.encode("utf-8")).hexdigest()[:16]
+
+
+def _search_query(parsed: dict):
+    exception_type = parsed["exception_type"].rsplit(".", 1)[-1]
+    words = normalize_error_message(parsed["message"]).split()[:QUERY_WORDS]
+    return " ".join([exception_type, *words])
+
+
+# Structure a stack trace into its exception, message and top frames, traces none of the
+# parsers recognize fall back to their first meaningful line
+def parse_stack_trace(text: str):
+    lines = (text or "").strip().splitlines()
+    for parser in TRACE_PARSERS:
+        parsed = parser(lines)
+        if parsed:
+            break
+    else:
+        # A python header alone says nothing about the error
+        first_line = next(
+            (
+                line.strip()
+                for line in lines
+                if line.strip() and not line.startswith(_PY_HEADER)
+            ),
+            "",
+        )
+        parsed = {
+            "language": None,
+            "exception_type": "",
+            "message": first_line,
+            "frames": [],
+        }
+    parsed["frames"] = parsed["frames"][:TOP_FRAMES]
+    parsed["fingerprint"] = fingerprint({**parsed, "language": parsed["language"] or ""})
+    parsed["query"] = (
+        _search_query(parsed) if parsed["language"] else parsed["message"][:200]
+    )
+    return parsed
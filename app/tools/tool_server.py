@@ -1,28 +1,117 @@
 import asyncio
 import aiohttp
-from fastmcp import FastMCP
+import json
+from fastmcp import Context, FastMCP
 from google import genai
 from google.genai import types
 import os
-import base64
 from dotenv import load_dotenv
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from app.client.sse import read_sse_events
+from app.schema.agent_message import AgentMessage
+from app.tools.agent_registry import AgentRegistry, local_agents
+from app.tools.blob_store import BlobStore
+from app.tools.error_index import ErrorIndex, error_statements
+from app.tools.error_report import (
+    MIN_CONFIDENCE,
+    extract_error_fields,
+    fast_error_report,
+    format_error_report,
+    text_extraction_hit_rate,
+    text_extraction_stats,
+)
+from app.tools.http_pool import HttpClientPool
+from app.tools.image_cache import ExtractionCache
+from app.tools.image_preprocess import PreprocessConfig, preprocess_image
+from app.tools.local_ocr import LocalOcr
+from app.tools.projections import (
+    project_github,
+    project_reddit,
+    project_stackoverflow,
+    projection_stats,
+)
+from app.tools.response_cache import ResponseCache
+from app.tools.semantic_index import SemanticIndex
+from app.tools.stack_trace import parse_stack_trace
+from app.tools.single_flight import SingleFlight
 
 load_dotenv()
 
 GITHUB_BASE = "https://api.github.com"
 REDDIT_BASE = "https://www.reddit.com"
 BASE_URL = "https://api.stackexchange.com/2.3"
+# Agent runs take much longer than the search apis so they get their own timeout
+AGENT_CALL_TIMEOUT = float(os.environ.get("AGENT_CALL_TIMEOUT", 300))
+# Stack Exchange accepts at most 100 semicolon separated ids per request
+STACKOVERFLOW_MAX_IDS = 100
+# "batch" fetches comments for all questions in one call, "concurrent" fetches per question
+COMMENTS_FETCH_MODE = os.environ.get("COMMENTS_FETCH_MODE", "batch")
+COMMENTS_CONCURRENCY = int(os.environ.get("COMMENTS_CONCURRENCY", 4))
+COMMENTS_MAX_PAGES = int(os.environ.get("COMMENTS_MAX_PAGES", 5))
+COMMENTS_PARAMS = {"order": "desc", "sort": "creation", "site": "stackoverflow"}
+# Seconds each source gets in search_all_sources before its results are left out
+MULTI_SEARCH_DEADLINE = float(os.environ.get("MULTI_SEARCH_DEADLINE", 5))
+MULTI_SEARCH_RRF_K = 60
 
 mcp = FastMCP("Coding-Buddy Tool Server")
 
-
-@mcp.tool(
-    name="error_tracer",
-    title="Get the exact error root cause",
-    description="Get all the information related to the occuring error",
+# Shared connection pool for all the upstream calls made by the tools
+http_pool = HttpClientPool.from_env()
+# Agent cards served from memory, refreshed in the background
+agent_registry = AgentRegistry.from_env(session=http_pool.session)
+# Identical search calls in flight at the same time share one upstream request
+single_flight = SingleFlight()
+# Response cache for the github, reddit and stackoverflow search tools
+response_cache = ResponseCache.from_env(single_flight=single_flight)
+# Bound the concurrent image analysis calls so they cant starve the search tools
+image_analysis_semaphore = asyncio.Semaphore(
+    int(os.environ.get("IMAGE_ANALYSIS_CONCURRENCY", 2))
 )
-async def error_extractor(image_path: str):
-    system_prompt = """
+# Previous error_tracer results keyed on the screenshot content
+extraction_cache = ExtractionCache.from_env()
+# Screenshots are cropped, downscaled and re-encoded before the upload
+preprocess_config = PreprocessConfig.from_env()
+preprocess_stats = {
+    "calls": 0,
+    "original_bytes": 0,
+    "processed_bytes": 0,
+    "bytes_saved": 0,
+    "last": None,
+}
+# Terminal screenshots are read locally first, gemini only sees the ones the parser cant structure
+local_ocr = LocalOcr.from_env()
+# The ocr is cpu bound, bound it like the image analysis calls so it cant take every thread
+local_ocr_semaphore = asyncio.Semaphore(int(os.environ.get("LOCAL_OCR_CONCURRENCY", 2)))
+# Counted apart from text_extraction_stats, which is the pasted text fast path
+local_ocr_stats = {"screenshots": 0, "answered_locally": 0, "low_confidence": 0}
+# Screenshots uploaded by the client, passed between the agents by their blob id
+blob_store = BlobStore.from_env()
+# Local full text index of previously resolved errors, both indexes create their files so
+# they are opened by serve_mcp_server and not on import
+error_index = None
+# Embedding index of the same resolutions for errors that are worded differently
+semantic_index = None
+_background_tasks = set()
+_genai_client = None
+
+
+# One gemini client shared by every error_tracer call
+def _get_genai_client():
+    global _genai_client
+    if _genai_client is None:
+        _genai_client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
+    return _genai_client
+
+
+def _read_file(path: str):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+# Instructions shared by the image and the text error extraction
+ERROR_TRACER_PROMPT = """
     You are an advanced code-error analyzer. Your task is to carefully examine the provided code or image containing code and extract all relevant information about errors in a structured, comprehensive, and precise manner.
     Output Format (strictly):
         * Line No: Exact line number where the error occurs
@@ -44,75 +133,353 @@ async def error_extractor(image_path: str):
     
     User Query : {user_query}
     """
+
+
+# Structured error report from gemini for a screenshot or a text part
+async def _trace_with_model(part: types.Part):
     contents = [
         types.Content(
             role="user",
             parts=[
                 types.Part.from_text(
-                    text=system_prompt.format(user_query="Traceback the error")
+                    text=ERROR_TRACER_PROMPT.format(user_query="Traceback the error")
                 )
             ],
-        )
+        ),
+        types.Content(role="user", parts=[part]),
     ]
-    with open(image_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
-        contents.append(
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_bytes(mime_type="image/png", data=encoded_string)
-                ],
-            )
-        )
-    client = genai.Client(
-        api_key=os.environ.get('GOOGLE_API_KEY')
-    )
     model = "gemini-2.5-flash"
     generate_content_config = types.GenerateContentConfig(
         thinking_config=types.ThinkingConfig(
             thinking_budget=-1,
         ),
     )
-    response = client.models.generate_content(
-        model=model, contents=contents, config=generate_content_config
-    )
+    async with image_analysis_semaphore:
+        response = await _get_genai_client().aio.models.generate_content(
+            model=model, contents=contents, config=generate_content_config
+        )
     return response.text
 
 
+@mcp.tool(
+    name="error_tracer",
+    title="Get the exact error root cause",
+    description="Get all the information related to the occuring error from an image blob id or an image path",
+)
+async def error_extractor(image_path: str = None, blob_id: str = None):
+    if blob_id:
+        image_bytes = blob_store.get(blob_id.removeprefix("blob:"))
+        if image_bytes is None:
+            return f"No image found for blob id {blob_id}, it may have expired"
+    elif image_path:
+        # Read the image off the event loop so the other tools keep being served
+        image_bytes = await asyncio.to_thread(_read_file, image_path)
+    else:
+        return "Either a blob id or an image path is required"
+    # An unchanged screen gives back the previous report without calling gemini
+    digest, cached_result = extraction_cache.get(image_bytes)
+    if cached_result is not None:
+        return cached_result
+    if local_ocr.enabled:
+        local_ocr_stats["screenshots"] += 1
+        async with local_ocr_semaphore:
+            text, ocr_confidence = await asyncio.to_thread(
+                local_ocr.extract_text, image_bytes
+            )
+        # Misread characters still parse, so only a confident read is answered locally
+        if text and ocr_confidence < local_ocr.min_confidence:
+            local_ocr_stats["low_confidence"] += 1
+        elif text:
+            fields, confidence = extract_error_fields(text)
+            if confidence >= MIN_CONFIDENCE:
+                local_ocr_stats["answered_locally"] += 1
+                result = format_error_report(fields)
+                extraction_cache.set(digest, result)
+                return result
+    upload_bytes, mime_type, report = await asyncio.to_thread(
+        preprocess_image, image_bytes, preprocess_config
+    )
+    preprocess_stats["calls"] += 1
+    preprocess_stats["original_bytes"] += report["original_bytes"]
+    preprocess_stats["processed_bytes"] += report["processed_bytes"]
+    preprocess_stats["bytes_saved"] += report["bytes_saved"]
+    preprocess_stats["last"] = report
+    result = await _trace_with_model(
+        types.Part.from_bytes(mime_type=mime_type, data=upload_bytes)
+    )
+    if result:
+        extraction_cache.set(digest, result)
+    return result
+
+
+@mcp.tool(
+    name="error_text_tracer",
+    title="Get the exact error root cause from error text",
+    description="Get all the information related to the occuring error from a pasted traceback or error output, use it instead of error_tracer when the error is given as text",
+)
+async def error_text_extractor(error_text: str):
+    # Common traceback formats are structured by the parser, the rest goes to gemini
+    report, _ = fast_error_report(error_text)
+    if report is not None:
+        return report
+    return await _trace_with_model(
+        types.Part.from_text(text=f"Error output:\n{error_text}")
+    )
+
+
+# Index the accepted answers in the background so repeated errors are answered locally,
+# each one under its own question title and the errors quoted in it, not the query that
+# found it
+def _index_resolutions(records: list):
+    resolutions = [
+        {
+            "signature": " ".join(
+                [record.get("title") or "", *error_statements(record.get("body"))]
+            ),
+            "source": "stackoverflow",
+            "title": record.get("title") or "",
+            "url": record.get("url"),
+            "resolution": record["top_answer"]["body"],
+        }
+        for record in records
+        if isinstance(record, dict) and (record.get("top_answer") or {}).get("is_accepted")
+    ]
+    if resolutions and error_index is not None:
+        for index in (error_index, semantic_index):
+            task = asyncio.create_task(asyncio.to_thread(index.add_many, resolutions))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+
 # Github issues tools
+async def _fetch_github_issues(query: str, limit: int):
+    session = http_pool.session()
+    url = f"{GITHUB_BASE}/search/issues"
+    params = {"q": query, "sort": "created", "order": "desc", "per_page": limit}
+    async with session.get(url=url, params=params) as response:
+        data = await response.json()
+        return data
+
+
 @mcp.tool(
     name="github_related_issues",
     title="Fetch similar github issues",
     description="Get all the relavent issues from github which are solved previously",
 )
-async def search_github_issues(query: str, limit: int = 5):
-    async with aiohttp.ClientSession() as session:
-        url = f"{GITHUB_BASE}/search/issues"
-        params = {"q": query, "sort": "created", "order": "desc", "per_page": limit}
-        async with session.get(url=url, params=params) as response:
-            data = await response.json()
-            return data
+async def search_github_issues(query: str, limit: int = 5, raw: bool = False):
+    return await _search_github(query, limit, raw)
+
+
+async def _search_github(query: str, limit: int, raw: bool = False):
+    data = await response_cache.get_or_fetch(
+        "github",
+        {"tool": "github_related_issues", "query": query, "limit": limit},
+        lambda: _fetch_github_issues(query, limit),
+        # Rate limit and validation errors come back without any items
+        cacheable=lambda data: "items" in data,
+    )
+    if raw:
+        return data
+    return project_github(data)
 
 
 # Reddit issues tool
+async def _fetch_reddit_issues(query: str, subreddit: str, limit: int):
+    session = http_pool.session()
+    url = f"{REDDIT_BASE}/r/{subreddit}/search.json"
+    params = {"q": query, "restrict_sr": 1, "sort": "new", "limit": limit}
+    async with session.get(url=url, params=params) as response:
+        r = await response.json()
+        data = [d for d in r["data"]["children"]]
+        return data
+
+
 @mcp.tool(
     name="reddit_related_issues",
     title="Fetch similar reddit issues",
     description="Get all the relavent issues from reddit which are solved previously",
 )
 async def search_reddit_issues(
-    query: str, subreddit: str = "programming", limit: int = 5
+    query: str, subreddit: str = "programming", limit: int = 5, raw: bool = False
 ):
-    async with aiohttp.ClientSession() as session:
-        url = f"{REDDIT_BASE}/r/{subreddit}/search.json"
-        params = {"q": query, "restrict_sr": 1, "sort": "new", "limit": limit}
-        async with session.get(url=url, params=params) as response:
-            r = await response.json()
-            data = [d for d in r["data"]["children"]]
-            return data
+    return await _search_reddit(query, subreddit, limit, raw)
+
+
+async def _search_reddit(query: str, subreddit: str, limit: int, raw: bool = False):
+    data = await response_cache.get_or_fetch(
+        "reddit",
+        {
+            "tool": "reddit_related_issues",
+            "query": query,
+            "subreddit": subreddit,
+            "limit": limit,
+        },
+        lambda: _fetch_reddit_issues(query, subreddit, limit),
+    )
+    return data if raw else project_reddit(data)
+
+
+# Fetch the comments of upto 100 questions in a single call and regroup them per question
+async def _fetch_comments_batch(session, question_ids: list[int]):
+    comments = {question_id: [] for question_id in question_ids}
+
+    async def _fetch_chunk(chunk: list[int]):
+        ids = ";".join(str(question_id) for question_id in chunk)
+        url = f"{BASE_URL}/questions/{ids}/comments"
+        for page in range(1, COMMENTS_MAX_PAGES + 1):
+            params = {**COMMENTS_PARAMS, "pagesize": 100, "page": page}
+            async with session.get(url=url, params=params) as response:
+                data = await response.json()
+            if "error_id" in data:
+                raise aiohttp.ClientError(data.get("error_message"))
+            for comment in data.get("items", []):
+                comments.setdefault(comment.get("post_id"), []).append(comment)
+            if not data.get("has_more"):
+                break
+
+    chunks = [
+        question_ids[i : i + STACKOVERFLOW_MAX_IDS]
+        for i in range(0, len(question_ids), STACKOVERFLOW_MAX_IDS)
+    ]
+    await asyncio.gather(*[_fetch_chunk(chunk) for chunk in chunks])
+    return comments
+
+
+# Fetch the comments of each question separately with a bounded concurrency
+async def _fetch_comments_concurrent(session, question_ids: list[int]):
+    semaphore = asyncio.Semaphore(COMMENTS_CONCURRENCY)
+
+    async def _fetch(question_id: int):
+        async with semaphore:
+            url = f"{BASE_URL}/questions/{question_id}/comments"
+            async with session.get(url=url, params=COMMENTS_PARAMS) as response:
+                data = await response.json()
+                return question_id, data.get("items", [])
+
+    results = await asyncio.gather(*[_fetch(q) for q in question_ids])
+    return dict(results)
+
+
+# Fetch the answers of upto 100 questions per call, the search filter carries the question
+# bodies but no answers so the accepted or best answer comes from here
+async def _attach_answers(session, items: list[dict]):
+    question_ids = [
+        item["question_id"]
+        for item in items
+        if item.get("question_id") and item.get("answer_count")
+    ]
+    if not question_ids:
+        return items
+    answers = {}
+
+    async def _fetch_chunk(chunk: list[int]):
+        ids = ";".join(str(question_id) for question_id in chunk)
+        params = {
+            "order": "desc",
+            "sort": "votes",
+            "site": "stackoverflow",
+            "filter": "withbody",
+            "pagesize": 100,
+        }
+        async with session.get(
+            url=f"{BASE_URL}/questions/{ids}/answers", params=params
+        ) as response:
+            data = await response.json()
+        if "error_id" in data:
+            raise aiohttp.ClientError(data.get("error_message"))
+        for answer in data.get("items", []):
+            answers.setdefault(answer.get("question_id"), []).append(answer)
+
+    chunks = [
+        question_ids[i : i + STACKOVERFLOW_MAX_IDS]
+        for i in range(0, len(question_ids), STACKOVERFLOW_MAX_IDS)
+    ]
+    try:
+        await asyncio.gather(*[_fetch_chunk(chunk) for chunk in chunks])
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        # The questions are still useful without their answers
+        return items
+    for item in items:
+        if item.get("question_id") in answers:
+            item["answers"] = answers[item["question_id"]]
+    return items
+
+
+# Attach the comments to every question, falling back to per question calls if the batch fails
+async def _attach_comments(session, items: list[dict]):
+    question_ids = [item["question_id"] for item in items if item.get("question_id")]
+    if not question_ids:
+        return items
+
+    if COMMENTS_FETCH_MODE == "concurrent":
+        comments = await _fetch_comments_concurrent(session, question_ids)
+    else:
+        try:
+            comments = await _fetch_comments_batch(session, question_ids)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            comments = await _fetch_comments_concurrent(session, question_ids)
+
+    for item in items:
+        question_id = item.get("question_id")
+        if question_id:
+            item["comments"] = comments.get(question_id, [])
+    return items
 
 
 # Stackoverflow tools
+async def _fetch_search_by_error(
+    errorMessage: str,
+    language: str,
+    technologies: list[str],
+    minScore: int,
+    includeComments: bool,
+    responseFormat: str,
+    limit: int,
+):
+    session = http_pool.session()
+    params = {
+        "order": "desc",
+        "sort": "votes",
+        "site": "stackoverflow",
+        "intitle": errorMessage,
+        "filter": "!9_bDDxJY5",  # default filter for questions
+    }
+
+    # Apply optional filters
+    if language:
+        params["tagged"] = language
+
+    if technologies:
+        # Join multiple technologies with a semicolon as required by Stack Overflow API
+        params["tagged"] = (
+            ";".join(technologies)
+            if not language
+            else f"{language};{';'.join(technologies)}"
+        )
+
+    if minScore is not None:
+        params["min"] = minScore  # min votes score
+
+    url = f"{BASE_URL}/search/advanced"
+    async with session.get(url=url, params=params) as response:
+        r = await response.json()
+
+        items = r.get("items", [])[:limit]
+        if responseFormat.lower() != "text":
+            await _attach_answers(session, items)
+
+        # Optionally include comments
+        if includeComments and items:
+            await _attach_comments(session, items)
+
+        if responseFormat.lower() == "json":
+            return items
+        elif responseFormat.lower() == "text":
+            return [f"{item['title']}: {item['link']}" for item in items]
+        else:
+            return items
+
+
 @mcp.tool(
     name="search_by_error_stackoverflow",
     title="Search Stack Overflow by error message with all filters applied",
@@ -126,60 +493,102 @@ async def search_by_error(
     includeComments: bool = False,
     responseFormat: str = "json",
     limit: int = 3,
+    raw: bool = False,
 ):
-    async with aiohttp.ClientSession() as session:
-        params = {
-            "order": "desc",
-            "sort": "votes",
-            "site": "stackoverflow",
-            "intitle": errorMessage,
-            "filter": "!9_bDDxJY5",  # default filter for questions
-        }
+    return await _search_stackoverflow_by_error(
+        errorMessage,
+        language,
+        technologies,
+        minScore,
+        includeComments,
+        responseFormat,
+        limit,
+        raw,
+    )
 
-        # Apply optional filters
-        if language:
-            params["tagged"] = language
 
-        if technologies:
-            # Join multiple technologies with a semicolon as required by Stack Overflow API
-            params["tagged"] = (
-                ";".join(technologies)
-                if not language
-                else f"{language};{';'.join(technologies)}"
-            )
+async def _search_stackoverflow_by_error(
+    errorMessage: str,
+    language: str = None,
+    technologies: list[str] = None,
+    minScore: int = None,
+    includeComments: bool = False,
+    responseFormat: str = "json",
+    limit: int = 3,
+    raw: bool = False,
+):
+    args = {
+        "errorMessage": errorMessage,
+        "language": language,
+        "technologies": technologies,
+        "minScore": minScore,
+        "includeComments": includeComments,
+        "responseFormat": responseFormat,
+        "limit": limit,
+    }
+    items = await response_cache.get_or_fetch(
+        "stackoverflow",
+        {"tool": "search_by_error_stackoverflow", **args},
+        lambda: _fetch_search_by_error(**args),
+        # Throttled or failed searches come back empty and should be retried
+        cacheable=bool,
+    )
+    if raw:
+        return items
+    projected = project_stackoverflow(items)
+    _index_resolutions(projected)
+    return projected
 
-        if minScore is not None:
-            params["min"] = minScore  # min votes score
-
-        url = f"{BASE_URL}/search/advanced"
-        async with session.get(url=url, params=params) as response:
-            r = await response.json()
-
-            items = r.get("items", [])[:limit]
-
-            # Optionally include comments
-            if includeComments and items:
-                for item in items:
-                    question_id = item.get("question_id")
-                    if question_id:
-                        comments_url = f"{BASE_URL}/questions/{question_id}/comments"
-                        async with session.get(
-                            comments_url,
-                            params={
-                                "order": "desc",
-                                "sort": "creation",
-                                "site": "stackoverflow",
-                            },
-                        ) as comments_resp:
-                            comments_data = await comments_resp.json()
-                            item["comments"] = comments_data.get("items", [])
-
-            if responseFormat.lower() == "json":
-                return items
-            elif responseFormat.lower() == "text":
-                return [f"{item['title']}: {item['link']}" for item in items]
-            else:
-                return items
+
+async def _fetch_stack_trace_questions(
+    query: str,
+    language: str,
+    technologies: list[str],
+    minScore: int,
+    includeComments: bool,
+    responseFormat: str,
+    limit: int,
+):
+    session = http_pool.session()
+    params = {
+        "order": "desc",
+        "sort": "relevance",
+        "site": "stackoverflow",
+        "intitle": query,
+        "filter": "!9_bDDxJY5",
+    }
+
+    # Optional filters
+    if language:
+        params["tagged"] = language
+
+    if technologies:
+        tags = ";".join(technologies)
+        if "tagged" in params:
+            params["tagged"] += f";{tags}"
+        else:
+            params["tagged"] = tags
+
+    if minScore is not None:
+        params["min"] = minScore
+
+    url = f"{BASE_URL}/search/advanced"
+    async with session.get(url=url, params=params) as response:
+        r = await response.json()
+        items = r.get("items", [])[:limit]
+        if responseFormat.lower() != "text":
+            await _attach_answers(session, items)
+
+        # Include comments if requested
+        if includeComments and items:
+            await _attach_comments(session, items)
+
+        if responseFormat.lower() == "json":
+            return items
+        elif responseFormat.lower() == "text":
+            return [f"{item['title']}: {item['link']}" for item in items]
+        else:
+            return items
 
 
 @mcp.tool(
@@ -195,60 +604,78 @@ async def analyze_stack_trace(
     includeComments: bool = False,
     responseFormat: str = "json",
     limit: int = 3,
+    raw: bool = False,
 ):
-    first_line = stackTrace.splitlines()[0] if stackTrace else ""
+    # The exception, message and top frames make the query, the fingerprint keys the
+    # cache so the same error from another machine or run is fetched only once
+    trace = parse_stack_trace(stackTrace)
+    args = {
+        "query": trace["query"],
+        "language": language or trace["language"],
+        "technologies": technologies,
+        "minScore": minScore,
+        "includeComments": includeComments,
+        "responseFormat": responseFormat,
+        "limit": limit,
+    }
+    items = await response_cache.get_or_fetch(
+        "stackoverflow",
+        {"tool": "analyze_stack_trace", "fingerprint": trace["fingerprint"], **args},
+        lambda: _fetch_stack_trace_questions(**args),
+        cacheable=bool,
+    )
+    if raw:
+        return items
+    projected = project_stackoverflow(items)
+    _index_resolutions(projected)
+    return projected
 
-    async with aiohttp.ClientSession() as session:
-        params = {
-            "order": "desc",
-            "sort": "relevance",
-            "site": "stackoverflow",
-            "intitle": first_line,
-            "filter": "!9_bDDxJY5",
-        }
 
-        # Optional filters
-        if language:
-            params["tagged"] = language
-
-        if technologies:
-            tags = ";".join(technologies)
-            if "tagged" in params:
-                params["tagged"] += f";{tags}"
-            else:
-                params["tagged"] = tags
-
-        if minScore is not None:
-            params["min"] = minScore
-
-        url = f"{BASE_URL}/search/advanced"
-        async with session.get(url=url, params=params) as response:
-            r = await response.json()
-            items = r.get("items", [])[:limit]
-
-            # Include comments if requested
-            if includeComments and items:
-                for item in items:
-                    question_id = item.get("question_id")
-                    if question_id:
-                        comments_url = f"{BASE_URL}/questions/{question_id}/comments"
-                        async with session.get(
-                            comments_url,
-                            params={
-                                "order": "desc",
-                                "sort": "creation",
-                                "site": "stackoverflow",
-                            },
-                        ) as comments_resp:
-                            comments_data = await comments_resp.json()
-                            item["comments"] = comments_data.get("items", [])
-
-            if responseFormat.lower() == "json":
-                return items
-            elif responseFormat.lower() == "text":
-                return [f"{item['title']}: {item['link']}" for item in items]
-            else:
-                return items
+async def _fetch_advanced_search(
+    keywords: str,
+    tags: list[str],
+    min_score: int,
+    has_accepted: bool,
+    include_comments: bool,
+    response_format: str,
+    limit: int,
+):
+    url = f"{BASE_URL}/search/advanced"
+    params = {
+        "order": "desc",
+        "sort": "votes",
+        "site": "stackoverflow",
+        "filter": "!9_bDDxJY5",
+    }
+
+    if keywords:
+        params["q"] = keywords
+
+    if tags:
+        params["tagged"] = ";".join(tags)
+
+    if min_score is not None:
+        params["min"] = min_score
+
+    if has_accepted:
+        params["accepted"] = "True"
+
+    session = http_pool.session()
+    async with session.get(url=url, params=params) as response:
+        r = await response.json()
+        items = r.get("items", [])[:limit]
+        if response_format.lower() != "text":
+            await _attach_answers(session, items)
+
+        if include_comments and items:
+            await _attach_comments(session, items)
+
+        if response_format.lower() == "json":
+            return items
+        elif response_format.lower() == "text":
+            return [f"{item['title']}: {item['link']}" for item in items]
+        else:
+            return items
 
 
 @mcp.tool(
@@ -264,61 +691,212 @@ async def advanced_search(
     include_comments: bool = False,
     response_format: str = "json",
     limit: int = 5,
+    raw: bool = False,
 ):
-    url = f"{BASE_URL}/search/advanced"
-    params = {
-        "order": "desc",
-        "sort": "votes",
-        "site": "stackoverflow",
-        "filter": "!9_bDDxJY5",
+    args = {
+        "keywords": keywords,
+        "tags": tags,
+        "min_score": min_score,
+        "has_accepted": has_accepted,
+        "include_comments": include_comments,
+        "response_format": response_format,
+        "limit": limit,
     }
+    items = await response_cache.get_or_fetch(
+        "stackoverflow",
+        {"tool": "advanced_search", **args},
+        lambda: _fetch_advanced_search(**args),
+        cacheable=bool,
+    )
+    if raw:
+        return items
+    projected = project_stackoverflow(items)
+    _index_resolutions(projected)
+    return projected
 
-    if keywords:
-        params["q"] = keywords
 
-    if tags:
-        params["tagged"] = ";".join(tags)
+# Run one source search within its deadline, a slow source is reported instead of waited on
+async def _search_source(name: str, search, deadline: float):
+    try:
+        return name, await asyncio.wait_for(search, timeout=deadline)
+    except asyncio.TimeoutError:
+        return name, TimeoutError(f"{name} did not answer within {deadline}s")
+    except Exception as e:
+        return name, e
 
-    if min_score is not None:
-        params["min"] = min_score
 
-    if has_accepted:
-        params["accepted"] = "True"
+def _multi_source_records(name: str, results):
+    if name == "github":
+        return [
+            {
+                "source": name,
+                "title": item["title"],
+                "url": item["url"],
+                "score": item.get("score"),
+                "resolved": item.get("state") == "closed",
+                "excerpt": item.get("body"),
+            }
+            for item in results.get("items", [])
+        ]
+    if name == "reddit":
+        return [
+            {
+                "source": name,
+                "title": post["title"],
+                "url": post["url"],
+                "score": post.get("score"),
+                "resolved": bool(post.get("num_comments")),
+                "excerpt": post.get("body"),
+            }
+            for post in results
+        ]
+    return [
+        {
+            "source": name,
+            "title": question["title"],
+            "url": question["url"],
+            "score": question.get("score"),
+            "resolved": bool(
+                question.get("top_answer") and question["top_answer"]["is_accepted"]
+            ),
+            "excerpt": (question.get("top_answer") or {}).get("body")
+            or question.get("body"),
+        }
+        for question in results
+    ]
+
+
+# Merge the per source lists with reciprocal rank fusion, duplicates are merged by url and title
+def _merge_results(results_by_source: dict, limit: int):
+    merged = {}
+    for name, results in results_by_source.items():
+        for rank, record in enumerate(_multi_source_records(name, results)):
+            if not record["title"]:
+                continue
+            key = " ".join(record["title"].lower().split())
+            entry = merged.get(record["url"]) or merged.get(key)
+            if entry is None:
+                entry = {**record, "sources": [], "rank_score": 0.0}
+                merged[record["url"]] = entry
+                merged[key] = entry
+            if name not in entry["sources"]:
+                entry["sources"].append(name)
+            entry["rank_score"] += 1 / (MULTI_SEARCH_RRF_K + rank + 1)
+            if record["resolved"]:
+                entry["resolved"] = True
+            if not entry["excerpt"]:
+                entry["excerpt"] = record["excerpt"]
+
+    ranked = {id(entry): entry for entry in merged.values()}.values()
+    ranked = sorted(
+        ranked,
+        key=lambda entry: entry["rank_score"] + (0.01 if entry["resolved"] else 0),
+        reverse=True,
+    )
+    for entry in ranked:
+        entry["rank_score"] = round(entry["rank_score"], 4)
+        del entry["source"]
+    return ranked[:limit]
+
+
+@mcp.tool(
+    name="search_all_sources",
+    title="Search GitHub, Reddit and Stack Overflow at once",
+    description="Search GitHub issues, Reddit and Stack Overflow concurrently for an error and return one merged, ranked list of the results that arrived in time",
+)
+async def search_all_sources(
+    query: str,
+    subreddit: str = "programming",
+    limit: int = 10,
+    per_source_limit: int = 5,
+    deadline: float = None,
+):
+    # Errors resolved before are answered from the local index without going online
+    local_results = (
+        await asyncio.to_thread(error_index.search, query, limit)
+        if error_index is not None
+        else []
+    )
+    if any(result["hit"] for result in local_results):
+        return {
+            "results": [result for result in local_results if result["hit"]],
+            "from_local_index": True,
+            "sources": ["local_index"],
+            "failed_sources": {},
+        }
+
+    deadline = deadline or MULTI_SEARCH_DEADLINE
+    searches = {
+        "github": _search_github(query, per_source_limit),
+        "reddit": _search_reddit(query, subreddit, per_source_limit),
+        "stackoverflow": _search_stackoverflow_by_error(query, limit=per_source_limit),
+    }
+    outcomes = await asyncio.gather(
+        *[_search_source(name, search, deadline) for name, search in searches.items()]
+    )
+
+    results_by_source = {}
+    failed_sources = {}
+    for name, outcome in outcomes:
+        if isinstance(outcome, Exception):
+            failed_sources[name] = str(outcome) or type(outcome).__name__
+        else:
+            results_by_source[name] = outcome
+
+    return {
+        "results": _merge_results(results_by_source, limit),
+        "from_local_index": False,
+        "sources": list(results_by_source),
+        "failed_sources": failed_sources,
+    }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url=url, params=params) as response:
-            r = await response.json()
-            items = r.get("items", [])[:limit]
-
-            if include_comments and items:
-                for item in items:
-                    question_id = item.get("question_id")
-                    if question_id:
-                        comments_url = f"{BASE_URL}/questions/{question_id}/comments"
-                        async with session.get(
-                            comments_url,
-                            params={
-                                "order": "desc",
-                                "sort": "creation",
-                                "site": "stackoverflow",
-                            },
-                        ) as comments_resp:
-                            comments_data = await comments_resp.json()
-                            item["comments"] = comments_data.get("items", [])
-
-            if response_format.lower() == "json":
-                return items
-            elif response_format.lower() == "text":
-                return [f"{item['title']}: {item['link']}" for item in items]
-            else:
-                return items
-
-
-async def _get_agent_card_req(url: str):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url=f"{url}/.well-known/agent.json") as response:
-            r = await response.json()
-            return r
+
+@mcp.tool(
+    name="search_local_index",
+    title="Search previously resolved errors",
+    description="Search the local index of previously resolved errors, use it before searching online",
+)
+async def search_local_index(error: str, limit: int = 5):
+    results = await asyncio.to_thread(error_index.search, error, limit)
+    return {
+        "results": results,
+        "from_local_index": True,
+        "hit": any(result["hit"] for result in results),
+    }
+
+
+@mcp.tool(
+    name="save_resolution",
+    title="Save an error resolution",
+    description="Save the resolution found for an error so the same error is answered locally next time",
+)
+async def save_resolution(error: str, resolution: str, title: str = None, url: str = None):
+    resolutions = [
+        {
+            "signature": error,
+            "source": "stackredhub",
+            "title": title or error.strip()[:200],
+            "url": url,
+            "resolution": resolution,
+        }
+    ]
+    await asyncio.to_thread(error_index.add_many, resolutions)
+    await asyncio.to_thread(semantic_index.add_many, resolutions)
+    return {"saved": True}
+
+
+@mcp.tool(
+    name="semantic_search",
+    title="Search previously resolved errors by meaning",
+    description="Search the previously resolved errors for ones similar to this error even when they are worded differently, use it when search_local_index has no hit. Results without hit are only candidates, reuse one only when it is clearly the same error",
+)
+async def semantic_search(error: str, limit: int = 5):
+    results = await asyncio.to_thread(semantic_index.search, error, limit)
+    return {
+        "results": results,
+        "from_local_index": True,
+        "hit": any(result["hit"] for result in results),
+    }
 
 
 @mcp.tool(
@@ -327,25 +905,155 @@ async def _get_agent_card_req(url: str):
     description="This tools is used to get all agent cards and agent skills",
 )
 async def get_agent_card():
-    agent_urls = os.environ.get("AGENT_URLS").split(",")
-    tasks = [_get_agent_card_req(url) for url in agent_urls]
-    agent_cards = await asyncio.gather(*tasks)
-    return agent_cards
+    # Agents that stopped answering are left out until they are healthy again
+    return await agent_registry.cards()
 
 
 @mcp.tool(
     name="call_agent",
     title="Call agent to complete the task",
-    description="This tool is used to call the agent which can get the task done",
+    description="This tool is used to call the agent which can get the task done, pass the image blob id along when the query has one",
 )
-async def call_agent(agent_url: str, query: str, session_id: str, user_id: str):
-    url = f"{agent_url}/run"
-    payload = {"query": query, "session_id": session_id, "user_id": user_id}
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url=url, json=payload) as response:
-            r = await response.json()
-            return r
+async def call_agent(
+    agent_url: str,
+    query: str,
+    session_id: str,
+    user_id: str,
+    blob_id: str = None,
+    ctx: Context = None,
+):
+    payload = {
+        "query": query,
+        "session_id": session_id,
+        "user_id": user_id,
+        "blob_id": blob_id,
+    }
+    progress = 0
+
+    # Relay the sub agent events as mcp progress, the orchestrator streams them on to the
+    # client while the agent is still working
+    async def on_event(event: dict):
+        nonlocal progress
+        progress += 1
+        await ctx.report_progress(
+            progress=progress, message=json.dumps({"agent_url": agent_url, **event})
+        )
+
+    return await run_agent(
+        agent_url, payload, on_event=on_event if ctx is not None else None
+    )
+
+
+# Run the agent behind agent_url and collect its events, shared by call_agent and the
+# in process orchestrator tools of a single node deployment
+async def run_agent(agent_url: str, payload: dict, on_event=None):
+    agent_response = {}
+    if local_agents.get(agent_url) is not None:
+        # Single node deployment, the agent runs in this process so no http hop is needed
+        events = local_agents.stream(agent_url, AgentMessage(**payload))
+        async with asyncio.timeout(AGENT_CALL_TIMEOUT):
+            async for event in events:
+                event = jsonable_encoder(event)
+                agent_response[event["type"]] = event["data"]
+                # The final response comes back as the result of the call itself
+                if on_event is not None and event["type"] != "final_response":
+                    await on_event(event)
+        return agent_response
+
+    session = http_pool.session()
+    async with session.post(
+        url=f"{agent_url}/run/stream",
+        json=payload,
+        timeout=aiohttp.ClientTimeout(total=AGENT_CALL_TIMEOUT),
+    ) as response:
+        # A failed call has no event stream, its body goes back as the error event
+        if response.status >= 400:
+            body = (await response.text())[:500]
+            event = {
+                "type": "error",
+                "data": f"{agent_url} returned {response.status}: {body}",
+            }
+            if on_event is not None:
+                await on_event(event)
+            return {"error": event["data"]}
+        async for event in read_sse_events(response):
+            agent_response[event["type"]] = event["data"]
+            if on_event is not None and event["type"] != "final_response":
+                await on_event(event)
+    return agent_response
+
+
+# Upload the raw screenshot bytes once, the agents only pass the returned blob id around
+@mcp.custom_route("/blobs", methods=["POST"])
+async def upload_blob(request: Request):
+    too_large = JSONResponse(
+        {"error": "blob is larger than the blob store"}, status_code=413
+    )
+    # Oversized uploads are refused before they are read into memory
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > blob_store.max_bytes:
+            return too_large
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > blob_store.max_bytes:
+            return too_large
+        chunks.append(chunk)
+    data = b"".join(chunks)
+    if not data:
+        return JSONResponse({"error": "empty blob"}, status_code=400)
+    try:
+        blob_id = blob_store.put(data)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    return JSONResponse({"blob_id": f"blob:{blob_id}"})
+
+
+# Tool server stats for monitoring
+@mcp.custom_route("/stats", methods=["GET"])
+async def server_stats(request: Request):
+    return JSONResponse(
+        {
+            "http_pool": http_pool.stats(),
+            "agent_registry": agent_registry.stats(),
+            "local_agents": local_agents.stats(),
+            "response_cache": response_cache.stats(),
+            "single_flight": single_flight.stats(),
+            "extraction_cache": extraction_cache.stats(),
+            "image_preprocess": preprocess_stats,
+            "blob_store": blob_store.stats(),
+            "projections": projection_stats,
+            "error_index": error_index.stats() if error_index is not None else None,
+            "semantic_index": semantic_index.stats()
+            if semantic_index is not None
+            else None,
+            "local_ocr": {**local_ocr.stats(), **local_ocr_stats},
+            "text_extraction": {
+                **text_extraction_stats,
+                "hit_rate": text_extraction_hit_rate(),
+            },
+        }
+    )
+
+
+# Run the mcp server with the connection pool opened and closed around it
+async def serve_mcp_server():
+    global error_index, semantic_index
+    await http_pool.start()
+    agent_registry.start()
+    error_index = ErrorIndex.from_env()
+    semantic_index = SemanticIndex.from_env()
+    try:
+        await mcp.run_async(transport="sse", host="0.0.0.0", port=8005)
+    finally:
+        await agent_registry.close()
+        await http_pool.close()
+        response_cache.close()
+        error_index.close()
+        semantic_index.close()
 
 
 def start_mcp_server():
-    mcp.run(transport="sse", host="0.0.0.0", port=8005)
+    asyncio.run(serve_mcp_server())
@@ -0,0 +1,175 @@
+# End to end latency of one orchestrator delegation: call_agent over mcp and http to another
+# agent server, call_agent over mcp to an agent in the same process, and the single node mode
+# where the orchestrator calls call_agent in memory and the agent runs in the same process
+# Run with: python -m benchmarks.in_process_agents [--model-latency SECONDS]
+# Both models are stubbed so only the hops between the agents are measured
+
+import asyncio
+import os
+import sys
+import time
+
+os.environ.update(AGENT_URLS="", LOCAL_OCR="false")
+
+import aiohttp
+import uvicorn
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolset, SseConnectionParams
+from google.genai import types
+from app.agent.agent_creator import create_agent
+from app.agent.base_agent import BaseAgent
+from app.agent.local_tools import ORCHESTRATOR_TOOLS
+from app.schema.agent_message import AgentMessage
+from app.tools.agent_registry import local_agents
+from app.tools.tool_server import http_pool, mcp
+
+REQUESTS = 200
+WARMUP = 10
+MCP_PORT = 8795
+AGENT_PORT = 8796
+AGENT_URL = f"http://127.0.0.1:{AGENT_PORT}"
+USER_ID = "user"
+AGENT_CARD = {
+    "agent": {
+        "name": "benchmark_agent",
+        "description": "Answers every query with a canned fix",
+        "version": "1.0.0",
+        "url": AGENT_URL,
+    },
+    "skills": [{"name": "Fix", "description": "Canned fix", "tags": ["error"]}],
+}
+
+
+# Model that answers instantly, the orchestrator one delegates the query with call_agent
+class StubLlm(BaseLlm):
+    latency: float = 0.0
+    delegate_to: str = None
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        await asyncio.sleep(self.latency)
+        last = llm_request.contents[-1]
+        answered = any(part.function_response for part in last.parts or [])
+        if self.delegate_to and not answered:
+            # The user text is the session id so every request starts a fresh session
+            session_id = next(part.text for part in last.parts if part.text)
+            call = types.FunctionCall(
+                name="call_agent",
+                args={
+                    "agent_url": self.delegate_to,
+                    "query": "ModuleNotFoundError: No module named 'requests'",
+                    "session_id": session_id,
+                    "user_id": USER_ID,
+                },
+            )
+            part = types.Part(function_call=call)
+        else:
+            part = types.Part(text="pip install requests")
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+class BenchmarkAgent(BaseAgent):
+    pass
+
+
+def new_agent(name: str, model: BaseLlm, tools: list):
+    llm_agent = LlmAgent(model=model, name=name, instruction="", tools=tools)
+    return BenchmarkAgent(
+        app_name="benchmark", session_service=InMemorySessionService(), agent=llm_agent
+    )
+
+
+async def wait_until_up(url: str):
+    async with aiohttp.ClientSession() as session:
+        for _ in range(100):
+            try:
+                async with session.get(url) as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not start")
+
+
+async def measure(orchestrator: BaseAgent, mode: str):
+    latencies = []
+    for i in range(WARMUP + REQUESTS):
+        message = AgentMessage(
+            query=f"{mode}-{i}", session_id=f"{mode}-{i}", user_id=USER_ID
+        )
+        start = time.perf_counter()
+        response = await orchestrator.execute(message)
+        if i >= WARMUP:
+            latencies.append(time.perf_counter() - start)
+        assert response.get("final_response"), response
+    latencies.sort()
+    return latencies
+
+
+def report(mode: str, latencies: list):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    print(f"{mode + ':':15}p50 {p50:6.1f} ms   p95 {p95:6.1f} ms")
+    return p50
+
+
+async def main():
+    latency = (
+        float(sys.argv[sys.argv.index("--model-latency") + 1])
+        if "--model-latency" in sys.argv
+        else 0.0
+    )
+    sub_agent = new_agent("benchmark_agent", StubLlm(model="stub", latency=latency), [])
+    toolset = McpToolset(
+        connection_params=SseConnectionParams(url=f"http://127.0.0.1:{MCP_PORT}/sse"),
+        tool_filter=["call_agent"],
+    )
+    orchestrator_model = StubLlm(model="stub", latency=latency, delegate_to=AGENT_URL)
+    mcp_orchestrator = new_agent("benchmark_orchestrator", orchestrator_model, [toolset])
+    local_orchestrator = new_agent(
+        "benchmark_orchestrator", orchestrator_model, ORCHESTRATOR_TOOLS
+    )
+
+    await http_pool.start()
+    mcp_server = asyncio.create_task(
+        mcp.run_async(
+            transport="sse", host="127.0.0.1", port=MCP_PORT, log_level="warning"
+        )
+    )
+    agent_server = uvicorn.Server(
+        uvicorn.Config(
+            create_agent(agent=sub_agent, agent_card=AGENT_CARD),
+            host="127.0.0.1",
+            port=AGENT_PORT,
+            log_level="warning",
+        )
+    )
+    agent_task = asyncio.create_task(agent_server.serve())
+    await wait_until_up(f"{AGENT_URL}/.well-known/agent.json")
+    await wait_until_up(f"http://127.0.0.1:{MCP_PORT}/blobs")
+
+    try:
+        http = await measure(mcp_orchestrator, "http")
+        local_agents.register(sub_agent, AGENT_CARD)
+        in_process = await measure(mcp_orchestrator, "in-process")
+        single_node = await measure(local_orchestrator, "single-node")
+    finally:
+        await toolset.close()
+        agent_server.should_exit = True
+        await agent_task
+        mcp_server.cancel()
+        await asyncio.gather(mcp_server, return_exceptions=True)
+        await http_pool.close()
+
+    print(f"delegations:    {REQUESTS} (stub model latency {latency * 1000:.0f} ms)")
+    before = report("mcp + http", http)
+    for mode, latencies in [("mcp + memory", in_process), ("single node", single_node)]:
+        after = report(mode, latencies)
+        print(f"{'':15}saved {before - after:.1f} ms per delegation ({1 - after / before:.0%})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
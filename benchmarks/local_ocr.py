@@ -0,0 +1,122 @@
+# Latency and field accuracy of the local ocr path on rendered terminal screenshots
+# Run with: python -m benchmarks.local_ocr [--engine rapidocr|tesseract] [--gemini]
+# With --gemini and GOOGLE_API_KEY set the same screenshots also go through the vision model
+
+import asyncio
+import io
+import random
+import sys
+import time
+from PIL import Image, ImageDraw, ImageFont
+from app.tools.error_index import normalize_error_message
+from app.tools.error_report import MIN_CONFIDENCE, extract_error_fields
+from app.tools.local_ocr import LocalOcr
+from app.tools.stack_trace import parse_stack_trace
+from benchmarks.stack_trace_parser import TEMPLATES
+
+FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf"
+THEMES = {"dark": ((30, 30, 30), (220, 220, 220)), "light": ((250, 250, 250), (40, 40, 40))}
+FONT_SIZES = [13, 16]
+FIELDS = ["exception_type", "message", "line", "fingerprint"]
+
+
+def render(text: str, theme: str, font_size: int):
+    try:
+        font = ImageFont.truetype(FONT_PATH, font_size)
+    except OSError:
+        font = ImageFont.load_default(font_size)
+    background, foreground = THEMES[theme]
+    lines = text.expandtabs(4).splitlines()
+    line_height = int(font_size * 1.45)
+    image = Image.new("RGB", (1000, line_height * len(lines) + 24), background)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((12, 12 + i * line_height), line, fill=foreground, font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def screenshots(rng: random.Random):
+    samples = []
+    for language, template in TEMPLATES.items():
+        text = template.format(dir="/home/dev/project", n=rng.randint(10, 99), key="id")
+        terminal = f"dev@box:~/project$ run {language}\nstarting...\n{text}"
+        for theme in THEMES:
+            for font_size in FONT_SIZES:
+                samples.append((language, text, render(terminal, theme, font_size)))
+    return samples
+
+
+def fields(parsed: dict):
+    return {
+        "exception_type": parsed["exception_type"],
+        "message": normalize_error_message(parsed["message"]),
+        "line": parsed["frames"][0]["line"] if parsed["frames"] else None,
+        "fingerprint": parsed["fingerprint"],
+    }
+
+
+async def gemini_latency(samples: list):
+    from google.genai import types
+    from app.tools.tool_server import _trace_with_model
+
+    latencies = []
+    correct = 0
+    for _, text, image_bytes in samples:
+        start = time.perf_counter()
+        result = await _trace_with_model(
+            types.Part.from_bytes(mime_type="image/png", data=image_bytes)
+        )
+        latencies.append(time.perf_counter() - start)
+        correct += parse_stack_trace(text)["exception_type"] in (result or "")
+    return latencies, correct
+
+
+def main():
+    samples = screenshots(random.Random(0))
+    engine = sys.argv[sys.argv.index("--engine") + 1] if "--engine" in sys.argv else "rapidocr"
+    ocr = LocalOcr(engine=engine)
+    # Load the models outside of the timings
+    ocr.extract_text(samples[0][2])
+    if not ocr.enabled:
+        print(f"ocr engine {ocr.engine_name} is not installed")
+        return
+
+    latencies = []
+    answered = 0
+    answered_correct = 0
+    matches = {field: 0 for field in FIELDS}
+    for _, text, image_bytes in samples:
+        start = time.perf_counter()
+        ocr_text, ocr_confidence = ocr.extract_text(image_bytes)
+        _, confidence = extract_error_fields(ocr_text)
+        latencies.append(time.perf_counter() - start)
+        expected = fields(parse_stack_trace(text))
+        found = fields(parse_stack_trace(ocr_text))
+        for field in FIELDS:
+            matches[field] += expected[field] == found[field]
+        # The tool server only answers a confident read that the parser understood
+        if ocr_confidence >= ocr.min_confidence and confidence >= MIN_CONFIDENCE:
+            answered += 1
+            answered_correct += expected == found
+
+    latencies.sort()
+    print(f"screenshots:               {len(samples)} ({len(TEMPLATES)} languages, {len(THEMES)} themes, {len(FONT_SIZES)} font sizes)")
+    print(f"local ocr + parse:         p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms")
+    print(f"answered locally:          {answered / len(samples):.0%} (ocr confidence >= {ocr.min_confidence})")
+    print(f"answered and all correct:  {answered_correct}/{answered}")
+    # Every wrong answer served locally is one the vision model would have had a chance at
+    print(f"wrong answers served:      {answered - answered_correct}")
+    for field in FIELDS:
+        print(f"{field + ' accuracy:':27}{matches[field] / len(samples):.0%}")
+
+    if "--gemini" in sys.argv:
+        gemini, correct = asyncio.run(gemini_latency(samples))
+        gemini.sort()
+        print(f"gemini vision:             p50 {gemini[len(gemini) // 2] * 1000:.0f} ms, max {gemini[-1] * 1000:.0f} ms")
+        print(f"gemini type found:         {correct / len(samples):.0%}")
+
+
+if __name__ == "__main__":
+    main()
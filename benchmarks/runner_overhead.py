@@ -0,0 +1,63 @@
+# Per request overhead of BaseAgent.get_current_session before and after the runner is shared
+# Run with: python -m benchmarks.runner_overhead
+
+import asyncio
+import time
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from app.agent.base_agent import BaseAgent
+
+REQUESTS = 2000
+APP_NAME = "benchmark"
+USER_ID = "user"
+
+
+class BenchmarkAgent(BaseAgent):
+    pass
+
+
+# The previous per request path, session lookup plus a new runner every time
+async def previous_get_current_session(agent: BaseAgent, user_id: str, session_id: str):
+    current_session = await agent.session_service.get_session(
+        app_name=agent.app_name, user_id=user_id, session_id=session_id
+    )
+    if not current_session:
+        current_session = await agent.session_service.create_session(
+            app_name=agent.app_name, user_id=user_id, session_id=session_id
+        )
+    return Runner(
+        agent=agent.agent, app_name=agent.app_name, session_service=agent.session_service
+    )
+
+
+def new_agent():
+    llm_agent = LlmAgent(model="gemini-2.5-flash", name="benchmark_agent")
+    return BenchmarkAgent(
+        app_name=APP_NAME, session_service=InMemorySessionService(), agent=llm_agent
+    )
+
+
+async def measure(get_current_session):
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        # A handful of sessions reused across requests like a real cli
+        await get_current_session(user_id=USER_ID, session_id=f"session-{i % 10}")
+    return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+async def main():
+    before_agent = new_agent()
+    after_agent = new_agent()
+    before = await measure(
+        lambda **kwargs: previous_get_current_session(before_agent, **kwargs)
+    )
+    after = await measure(after_agent.get_current_session)
+    print(f"requests: {REQUESTS}")
+    print(f"runner per request: {before:.1f} us/request")
+    print(f"shared runner:      {after:.1f} us/request")
+    print(f"speedup:            {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
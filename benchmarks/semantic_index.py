@@ -0,0 +1,123 @@
+# Query latency and recall of the semantic index at 1M entries, exact scan vs the k-means lists
+# Run with: python -m benchmarks.semantic_index [entries]
+
+import sys
+import tempfile
+import time
+import numpy as np
+from app.tools.semantic_index import HashingEmbedder, SemanticIndex, VectorIndex
+
+DIM = 128
+CLUSTERS = 2000
+QUERIES = 200
+BATCH = 32
+TOP_K = 10
+ADD_BATCH = 100000
+
+
+# Unit vectors scattered around random centres, close to how paraphrases of one error group up
+def clustered_vectors(rng, centres: np.ndarray, count: int):
+    vectors = centres[rng.integers(0, CLUSTERS, count)]
+    vectors += 0.6 * rng.standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def percentile(samples: list, q: float):
+    return float(np.percentile(samples, q)) * 1000
+
+
+def time_single(index: VectorIndex, queries: np.ndarray):
+    samples = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search_vectors(query[None, :], k=TOP_K)[0])
+        samples.append(time.perf_counter() - start)
+    return samples, results
+
+
+def time_batched(index: VectorIndex, queries: np.ndarray):
+    start = time.perf_counter()
+    for offset in range(0, len(queries), BATCH):
+        index.search_vectors(queries[offset : offset + BATCH], k=TOP_K)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def recall(exact: list, approximate: list):
+    found = sum(
+        len({row for row, _ in a} & {row for row, _ in e})
+        for e, a in zip(exact, approximate)
+    )
+    return found / sum(len(e) for e in exact)
+
+
+def end_to_end(directory: str):
+    errors = [
+        f"{kind}: {message} {name}"
+        for kind, message in [
+            ("ModuleNotFoundError", "No module named"),
+            ("KeyError", "missing key"),
+            ("TypeError", "object is not subscriptable"),
+            ("AttributeError", "object has no attribute"),
+        ]
+        for name in [f"name_{i}" for i in range(250)]
+    ]
+    index = SemanticIndex(HashingEmbedder(DIM), VectorIndex(directory, dim=DIM))
+    index.add_many(
+        [
+            {"signature": error, "title": error, "url": f"https://example.com/{i}", "source": "bench"}
+            for i, error in enumerate(errors)
+        ]
+    )
+    start = time.perf_counter()
+    for error in errors[:QUERIES]:
+        index.search(f"{error} while importing", limit=5)
+    elapsed = (time.perf_counter() - start) / QUERIES
+    index.close()
+    return elapsed
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((CLUSTERS, DIM)).astype(np.float32)
+    with tempfile.TemporaryDirectory() as directory:
+        index = VectorIndex(directory, dim=DIM)
+        start = time.perf_counter()
+        for offset in range(0, entries, ADD_BATCH):
+            count = min(ADD_BATCH, entries - offset)
+            index.add(
+                clustered_vectors(rng, centres, count),
+                [{"url": f"u{offset + i}"} for i in range(count)],
+            )
+        build = time.perf_counter() - start
+
+        queries = clustered_vectors(rng, centres, QUERIES)
+        centroids, index._centroids = index._centroids, None
+        exact_samples, exact = time_single(index, queries)
+        exact_batched = time_batched(index, queries)
+        index._centroids = centroids
+        ivf_samples, approximate = time_single(index, queries)
+        ivf_batched = time_batched(index, queries)
+        index.close()
+
+        e2e = end_to_end(f"{directory}/e2e")
+
+    print(f"entries: {entries}, dim: {DIM}, lists: {index.n_lists}, probes: {index.n_probe}")
+    print(f"build (add + k-means): {build:.1f} s")
+    print(
+        f"exact single query:    p50 {percentile(exact_samples, 50):.1f} ms, "
+        f"p95 {percentile(exact_samples, 95):.1f} ms"
+    )
+    print(f"exact batched:         {exact_batched * 1000:.1f} ms/query (batch {BATCH})")
+    print(
+        f"ivf single query:      p50 {percentile(ivf_samples, 50):.1f} ms, "
+        f"p95 {percentile(ivf_samples, 95):.1f} ms"
+    )
+    print(f"ivf batched:           {ivf_batched * 1000:.1f} ms/query (batch {BATCH})")
+    print(f"ivf recall@{TOP_K}:        {recall(exact, approximate):.3f}")
+    print(f"embed + search (1k):   {e2e * 1000:.2f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
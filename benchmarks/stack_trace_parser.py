@@ -0,0 +1,96 @@
+# Throughput of the stack trace parser and stability of its fingerprints over a generated corpus
+# Run with: python -m benchmarks.stack_trace_parser
+
+import random
+import time
+from app.tools.stack_trace import parse_stack_trace
+
+TRACES_PER_TEMPLATE = 2000
+
+# One template per language, {dir} and {n} vary between machines and runs of the same error
+TEMPLATES = {
+    "python": """Traceback (most recent call last):
+  File "{dir}/app/main.py", line {n}, in <module>
+    run()
+  File "{dir}/app/main.py", line {n}, in run
+    load(config)
+  File "{dir}/app/loader.py", line {n}, in load
+    return data["{key}"]
+KeyError: '{key}'
+""",
+    "java": """Exception in thread "main" java.lang.IllegalStateException: Failed to start
+\tat com.example.App.start(App.java:{n})
+\tat com.example.App.main(App.java:{n})
+Caused by: java.lang.NullPointerException: Cannot invoke "String.length()" because "{key}" is null
+\tat com.example.Util.len(Util.java:{n})
+\tat com.example.App.start(App.java:{n})
+\t... 1 more
+""",
+    "javascript": """{dir}/index.js:{n}
+  console.log(user.{key}.first);
+TypeError: Cannot read properties of undefined (reading '{key}')
+    at Object.<anonymous> ({dir}/index.js:{n}:25)
+    at Module._compile (node:internal/modules/cjs/loader:1256:14)
+    at node:internal/main/run_main_module:28:49
+""",
+    "go": """panic: runtime error: index out of range [{n}] with length 3
+
+goroutine 1 [running]:
+main.get(...)
+\t{dir}/prog.go:{n}
+main.main()
+\t{dir}/prog.go:{n} +0x1d
+exit status 2
+""",
+    "rust": """thread 'main' panicked at src/main.rs:{n}:5:
+called `Option::unwrap()` on a `None` value
+stack backtrace:
+   0: rust_begin_unwind
+             at /rustc/{key}/library/std/src/panicking.rs:645:5
+   1: core::panicking::panic
+             at /rustc/{key}/library/core/src/panicking.rs:144:5
+   2: demo::main
+             at ./src/main.rs:{n}:5
+""",
+}
+
+
+def corpus(rng: random.Random):
+    traces = []
+    for language, template in TEMPLATES.items():
+        for _ in range(TRACES_PER_TEMPLATE):
+            trace = template.format(
+                dir=rng.choice(["/home/dev/project", "/srv/app", "C:/work/repo"]),
+                n=rng.randint(1, 500),
+                key="id",
+            )
+            traces.append((language, trace))
+    rng.shuffle(traces)
+    return traces
+
+
+def main():
+    traces = corpus(random.Random(0))
+    total_bytes = sum(len(trace) for _, trace in traces)
+
+    start = time.perf_counter()
+    parsed = [parse_stack_trace(trace) for _, trace in traces]
+    elapsed = time.perf_counter() - start
+
+    fingerprints = {}
+    detected = 0
+    for (language, _), result in zip(traces, parsed):
+        detected += result["language"] == language
+        fingerprints.setdefault(language, set()).add(result["fingerprint"])
+
+    print(f"traces:      {len(traces)} ({total_bytes / 1e6:.1f} MB)")
+    print(f"throughput:  {len(traces) / elapsed:,.0f} traces/s, {total_bytes / 1e6 / elapsed:.1f} MB/s")
+    print(f"per trace:   {elapsed / len(traces) * 1e6:.1f} us")
+    print(f"detected:    {detected / len(traces):.1%} of the languages")
+    # Each template is one error, paths and line numbers must not change its fingerprint
+    for language, found in fingerprints.items():
+        print(f"{language + ':':12} {len(found)} distinct fingerprint(s)")
+
+
+if __name__ == "__main__":
+    main()